@@ -1,6 +1,7 @@
 import random
-from copy import deepcopy
-from utils.Classes import Team, LeagueIndividual
+import numpy as np
+from utils.Classes import LeagueIndividual
+from utils.metrics import record_attempts, record_repair
 
 # CROSSOVER BY TEAM
 def team_crossover(parent1: LeagueIndividual, parent2: LeagueIndividual) -> tuple:
@@ -28,51 +29,54 @@ def team_crossover(parent1: LeagueIndividual, parent2: LeagueIndividual) -> tupl
     """
 
     # Extracting necessary information from the parents
-    num_teams = len(parent1.league) 
+    num_teams = len(parent1.genome) 
     team_structure = parent1.team_structure 
-    players_by_position = parent1.players_by_position
+    table = parent1.table
     budget = parent1.budget_limit
     max_attempts = 100
     
     # Function to build a valid child
+    # players already in the child are marked in a boolean mask over player ids, so checking
+    # a team of parent 2 is a single lookup and the free players of a position are a slice of the mask
     def build_valid_child(p1: LeagueIndividual, p2: LeagueIndividual) -> LeagueIndividual:
-        for _ in range(max_attempts):
+        for attempt in range(1, max_attempts + 1):
             crossover_point = random.randint(1, num_teams - 1) # Random crossover point
-            child_teams = []
-            used_names = set()
+            used = np.zeros(len(table), dtype=bool)
 
             # Copy prefix from parent 1
-            for team in p1.league[:crossover_point]:
-                child_teams.append(team)
-                used_names.update(player.name for player in team.players)
+            child_teams = [p1.genome[:crossover_point]]
+            used[p1.genome[:crossover_point]] = True
+            count = crossover_point
 
             # Add teams from parent 2 without duplicates
-            for team in p2.league:
-                names = [p.name for p in team.players]
-                if len(child_teams) < num_teams and all(name not in used_names for name in names):
-                    child_teams.append(team)
-                    used_names.update(names)
+            for team_ids in p2.genome:
+                if count < num_teams and not used[team_ids].any():
+                    child_teams.append(team_ids[None])
+                    used[team_ids] = True
+                    count += 1
 
             # Fill missing teams
-            while len(child_teams) < num_teams:
-                team_players = []
-                for pos, count in team_structure.items():
-                    available = [p for p in players_by_position[pos] if p.name not in used_names]
-                    if len(available) < count:
+            while count < num_teams:
+                team_ids = []
+                for pos, required in team_structure.items():
+                    available = table.free_ids(pos, used)
+                    if len(available) < required:
                         break  # not enough players
-                    selected = random.sample(available, count)
-                    team_players.extend(selected)
+                    team_ids.extend(random.sample(available.tolist(), required))
 
-                new_team = Team(team_players)
-                if new_team.is_valid(team_structure, budget):
-                    child_teams.append(new_team)
-                    used_names.update(p.name for p in team_players)
+                if table.is_valid_team(team_ids, team_structure, budget):
+                    child_teams.append(np.array([team_ids]))
+                    used[team_ids] = True
+                    count += 1
                 else:
                     break  # invalid team, try another child
 
-            if len(child_teams) == num_teams:
-                return LeagueIndividual(players_by_position, team_structure, budget, num_teams, league=child_teams)
+            if count == num_teams:
+                record_attempts("team_crossover", attempt, max_attempts)
+                return LeagueIndividual(table, team_structure, budget, num_teams,
+                                        genome=np.concatenate(child_teams).astype(np.int32))
 
+        record_attempts("team_crossover", max_attempts, max_attempts, success=False)
         return None
 
     child1 = build_valid_child(parent1, parent2)
@@ -94,7 +98,8 @@ def position_crossover(parent1: LeagueIndividual, parent2: LeagueIndividual) ->
     Mixes players from both parents accross all teams. Builds a pool of
     players from both parents  and samples from it to create a child.
     Ensuring that the resulting child is valid and respects the 
-    team structure and budget constraints.
+    team structure and budget constraints: teams over budget are
+    fixed with same-position swaps (see repair_budget).
 
     Parameters:
         parent1 (LeagueIndividual): The first parent individual.
@@ -110,64 +115,58 @@ def position_crossover(parent1: LeagueIndividual, parent2: LeagueIndividual) ->
 
     # Extracting necessary information from the parents
     team_structure = parent1.team_structure
-    players_by_position = parent1.players_by_position
+    table = parent1.table
     budget = parent1.budget_limit
-    num_teams = len(parent1.league)
+    num_teams = len(parent1.genome)
     max_attempts = 100
 
+    # Players of both parents, as a boolean mask over player ids (so each player counts once)
+    in_parents = np.zeros(len(table), dtype=bool)
+    in_parents[parent1.genome] = True
+    in_parents[parent2.genome] = True
+    combined_by_position = {pos: table.free_ids(pos, ~in_parents).tolist() for pos in team_structure}
+
     # Function to build a valid child
     def build_valid_child():
-        for _ in range(max_attempts):
-            combined_by_position = {pos: [] for pos in team_structure}
-            used_names = set()
-
-            # Combine players from both parents by position
-            for individual in [parent1, parent2]:
-                for team in individual.league:
-                    for player in team.players:
-                        if player.name not in used_names:
-                            combined_by_position[player.position].append(player)
-                            used_names.add(player.name)
+        for attempt in range(1, max_attempts + 1):
 
             # Shuffle and split players into child pool
-            child_pool = {pos: [] for pos in team_structure}
-            for pos, players in combined_by_position.items():
-                random.shuffle(players)
-                half = len(players) // 2
-                child_pool[pos] = players[:half]
+            child_pool = {}
+            in_pool = np.zeros(len(table), dtype=bool)
+            for pos, ids in combined_by_position.items():
+                random.shuffle(ids)
+                child_pool[pos] = ids[:len(ids) // 2]
+                in_pool[child_pool[pos]] = True
 
             # Fill up if needed
             for pos, required_count in team_structure.items():
                 total_needed = required_count * num_teams
                 current = len(child_pool[pos])
-                available = [p for p in players_by_position[pos] if p.name not in {x.name for x in child_pool[pos]}]
+                available = table.free_ids(pos, in_pool)
                 if current < total_needed and len(available) >= (total_needed - current):
-                    child_pool[pos].extend(random.sample(available, total_needed - current))
-
-            all_players = deepcopy(child_pool)
-            league = []
-            used_names = set()
-
-            # Create new teams
-            for _ in range(num_teams):
-                team_players = []
-                for pos, count in team_structure.items():
-                    candidates = [p for p in all_players[pos] if p.name not in used_names]
-                    if len(candidates) < count:
-                        break
-                    selected = random.sample(candidates, count)
-                    team_players.extend(selected)
-                    used_names.update(p.name for p in selected)
-                    all_players[pos] = [p for p in all_players[pos] if p.name not in used_names]
-
-                team = Team(team_players)
-                if not team.is_valid(team_structure, budget):
-                    break
-                league.append(team)
-
-            if len(league) == num_teams:
-                return LeagueIndividual(players_by_position, team_structure, budget, num_teams, league=league)
-
+                    child_pool[pos].extend(random.sample(available.tolist(), total_needed - current))
+
+            # Create new teams: the shuffled pool of each position is cut into num_teams slices
+            if any(len(child_pool[pos]) < count * num_teams for pos, count in team_structure.items()):
+                continue
+            columns = []
+            for pos, count in team_structure.items():
+                ids = child_pool[pos]
+                random.shuffle(ids)
+                columns.append(np.array(ids[:count * num_teams], dtype=np.int32).reshape(num_teams, count))
+            league = np.hstack(columns)
+
+            # Repair teams over budget instead of discarding the child
+            if (table.salary[league].sum(axis=1) > budget).any():
+                swaps, repaired = repair_budget(league, table, budget)
+                record_repair("position_crossover", swaps, repaired)
+                if not repaired:
+                    continue
+
+            record_attempts("position_crossover", attempt, max_attempts)
+            return LeagueIndividual(table, team_structure, budget, num_teams, genome=league)
+
+        record_attempts("position_crossover", max_attempts, max_attempts, success=False)
         return None  # All attempts failed
 
     child1 = build_valid_child()
@@ -177,3 +176,67 @@ def position_crossover(parent1: LeagueIndividual, parent2: LeagueIndividual) ->
         raise ValueError("Could not generate valid children after multiple attempts.")
 
     return child1, child2
+
+
+
+# BUDGET REPAIR
+def repair_budget(league, table, budget):
+
+    """
+    Repairs, in place, the teams of a league that exceed the budget with same-position swaps.
+    While some team is over budget, the team with the largest excess swaps one of its players
+    for the same-position player that lowers its salary the most: either a player of another
+    team that stays within budget, or the cheapest player of that position not in the league.
+    The repair is deterministic, and every swap lowers the total excess, so it always ends.
+
+    Parameters:
+        league (np.ndarray): Player ids of the league, of shape (num_teams, players_per_team).
+        table (PlayerTable): The player table the ids refer to.
+        budget (float): Maximum salary of a team.
+
+    Returns:
+        tuple: The number of swaps made and True if every team is within budget.
+    """
+
+    salaries = table.salary[league]
+    codes = table.position_code[league]
+    team_salaries = salaries.sum(axis=1)
+    used = np.zeros(len(table), dtype=bool)
+    used[league] = True
+    swaps = 0
+
+    while (team_salaries > budget).any():
+        t = int(np.argmax(team_salaries - budget))
+
+        # swaps with the players of the other teams: gain[a, u, b] for player a of t and player b of team u
+        gain = salaries[t][:, None, None] - salaries[None]
+        other_salaries = team_salaries[None, :, None] + gain
+        allowed = (codes[t][:, None, None] == codes[None]) & (gain > 0) & (other_salaries <= budget)
+        allowed[:, t, :] = False
+        gain = np.where(allowed, gain, 0.0)
+        a, u, b = np.unravel_index(np.argmax(gain), gain.shape)
+        best_gain, best_swap = gain[a, u, b], (a, u, b)
+
+        # swaps with the cheapest player of the same position outside the league
+        for slot in range(league.shape[1]):
+            free = table.free_ids(table.positions[codes[t, slot]], used)
+            if len(free):
+                cheapest = free[np.argmin(table.salary[free])]
+                if salaries[t, slot] - table.salary[cheapest] > best_gain:
+                    best_gain, best_swap = salaries[t, slot] - table.salary[cheapest], (slot, None, cheapest)
+
+        if best_gain <= 0:
+            return swaps, False
+
+        a, u, b = best_swap
+        if u is None:
+            used[league[t, a]], used[b] = False, True
+            league[t, a], salaries[t, a] = b, table.salary[b]
+        else:
+            league[t, a], league[u, b] = league[u, b], league[t, a]
+            salaries[t, a], salaries[u, b] = salaries[u, b], salaries[t, a]
+            team_salaries[u] = salaries[u].sum()
+        team_salaries[t] = salaries[t].sum()
+        swaps += 1
+
+    return swaps, True
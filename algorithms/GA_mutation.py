@@ -1,6 +1,6 @@
 import random
-import copy
-from utils.Classes import Team
+import numpy as np
+from utils.metrics import record_attempts
 
 # MUTATION SWAP PLAYERS
 def mutation_swap_players(individual, max_attempts=100):
@@ -21,56 +21,44 @@ def mutation_swap_players(individual, max_attempts=100):
     Raises:
         ValueError: If a valid mutation cannot be produced after multiple attempts.
     """
-    # ensure the individual is valid
-    for _ in range(max_attempts):
-        new_indiv = copy.deepcopy(individual)
-        if new_indiv.league is None:
-            continue
-
-        team_count = len(new_indiv.league)
+    # one copy per offspring: the swaps are applied in place to its own genome and team sums
+    # (copy-on-write, so the genome is copied once, by the first swap)
+    new_indiv = individual.copy()
+    if new_indiv.genome is not None:
+        codes = new_indiv.table.position_code[new_indiv.genome] # position code of every player (kept by the swaps)
+        team_count, team_size = codes.shape
+
+    for attempt in range(1, max_attempts + 1):
+        if new_indiv.genome is None:
+            break
         any_success = False
 
-        for i, team1 in enumerate(new_indiv.league):
+        for i in range(team_count):
             for _ in range(10):  # max_attempts_per_team
-                j = random.choice([idx for idx in range(team_count) if idx != i]) # randomly select another team
-                team2 = new_indiv.league[j]
+                j = random.randrange(team_count - 1) # randomly select another team
+                j += j >= i
 
-                # Check if teams have players in common positions
-                common_positions = list({p.position for p in team1.players}.intersection(
-                                         {p.position for p in team2.players}))
-                if not common_positions:
+                # Randomly select a player and a player of the same position in the other team
+                a = random.randrange(team_size)
+                same_position = np.flatnonzero(codes[j] == codes[i, a])
+                if not len(same_position):
                     continue
-                
-                # Randomly select a position and players to swap
-                pos = random.choice(common_positions)
-                p1 = random.choice([p for p in team1.players if p.position == pos])
-                p2 = random.choice([p for p in team2.players if p.position == pos])
-
-                # Swap players
-                new_team1 = Team([p2 if p.name == p1.name else p for p in team1.players])
-                new_team2 = Team([p1 if p.name == p2.name else p for p in team2.players])
-                
-                temp_league = new_indiv.league[:]
-                temp_league[i] = new_team1
-                temp_league[j] = new_team2
-
-                all_names = [p.name for team in temp_league for p in team.players]
-                if len(all_names) != len(set(all_names)):
-                    continue
-                    
-                # Check if the new teams are valid
-                if new_team1.is_valid(new_indiv.team_structure, new_indiv.budget_limit) and \
-                   new_team2.is_valid(new_indiv.team_structure, new_indiv.budget_limit):
-
-                    new_indiv.league[i] = new_team1
-                    new_indiv.league[j] = new_team2
+                b = same_position[random.randrange(len(same_position))]
+
+                # Swap players if both teams stay within budget (checked in O(1) on the running team sums;
+                # a swap between two teams cannot create duplicates, so nothing else needs checking or undoing)
+                genome = new_indiv.genome
+                p_out, p_in = genome[i, a], genome[j, b]
+                if new_indiv.delta_fitness(i, j, p_out, p_in) != float('inf'):
+                    new_indiv.apply_swap(i, j, p_out, p_in)
                     any_success = True
                     break
 
         if any_success:
-            new_indiv.fitness = new_indiv.evaluate_fitness()
+            record_attempts("mutation_swap_players", attempt, max_attempts)
             return new_indiv
 
+    record_attempts("mutation_swap_players", max_attempts, max_attempts, success=False)
     raise ValueError("mutation_swap_players: Could not produce valid individual after retries.")
 
 
@@ -95,57 +83,56 @@ def mutation_regenerate_team(individual, max_attempts=100):
         ValueError: If a valid mutation cannot be produced after multiple attempts.    
     """
     
-    for _ in range(max_attempts):
-        new_indiv = copy.deepcopy(individual)
+    for attempt in range(1, max_attempts + 1):
+        new_indiv = individual.copy()
         team_structure = new_indiv.team_structure
         budget = new_indiv.budget_limit
-        num_teams = len(new_indiv.league)
+        table = new_indiv.table
+        league = new_indiv.genome.tolist() # player ids of each team, the genome is updated at the end
+        num_teams = len(league)
 
         # Randomly select a team to regenerate
         team_x_index = random.randint(0, num_teams - 1)
-        team_x = new_indiv.league[team_x_index]
-        team_x_players = team_x.players
+        team_x_players = league[team_x_index]
 
         # create a pool of players from the other teams
         donor_teams = [i for i in range(num_teams) if i != team_x_index]
         donor_pool = {pos: [] for pos in team_structure}
         for i in donor_teams:
-            for p in new_indiv.league[i].players:
-                donor_pool[p.position].append((p, i))
+            for p in league[i]:
+                donor_pool[table.position_of(p)].append((p, i))
 
         # Check if we can fill the team structure with the donor pool
         selected_new_players = []
         selected_indices = {i: set() for i in donor_teams}
         for pos, count in team_structure.items():
-            candidates = [entry for entry in donor_pool[pos] if entry[0].name not in [p.name for p in selected_new_players]]
+            candidates = [entry for entry in donor_pool[pos] if entry[0] not in selected_new_players]
             if len(candidates) < count:
                 break
             picks = random.sample(candidates, count)
             selected_new_players.extend([p for p, _ in picks])
             for p, idx in picks:
-                selected_indices[idx].add(p.name)
+                selected_indices[idx].add(p)
 
         if len(selected_new_players) != sum(team_structure.values()):
             continue
 
         # create a new team with the selected players
-        new_team_x = Team(selected_new_players)
-        if not new_team_x.is_valid(team_structure, budget):
+        if not table.is_valid_team(selected_new_players, team_structure, budget):
             continue
 
-        new_indiv.league[team_x_index] = new_team_x
+        league[team_x_index] = selected_new_players
 
         # redistribute the players from team x to the other teams
         to_redistribute = {pos: [] for pos in team_structure}
         for p in team_x_players:
-            to_redistribute[p.position].append(p)
+            to_redistribute[table.position_of(p)].append(p)
 
         # Check if we can fill the teams with the remaining players
         valid = True
         for i in donor_teams:
-            team = new_indiv.league[i]
-            remaining = [p for p in team.players if p.name not in selected_indices[i]]
-            slots = {pos: team_structure[pos] - sum(1 for p in remaining if p.position == pos) for pos in team_structure}
+            remaining = [p for p in league[i] if p not in selected_indices[i]]
+            slots = {pos: team_structure[pos] - sum(1 for p in remaining if table.position_of(p) == pos) for pos in team_structure}
             added = []
 
             for pos, count in slots.items():
@@ -154,94 +141,81 @@ def mutation_regenerate_team(individual, max_attempts=100):
                     break
                 chosen = random.sample(to_redistribute[pos], count)
                 added.extend(chosen)
-                to_redistribute[pos] = [p for p in to_redistribute[pos] if p.name not in [x.name for x in chosen]]
+                to_redistribute[pos] = [p for p in to_redistribute[pos] if p not in chosen]
 
             if not valid:
                 break
 
-            rebuilt = Team(remaining + added)
-            if not rebuilt.is_valid(team_structure, budget):
+            rebuilt = remaining + added
+            if not table.is_valid_team(rebuilt, team_structure, budget):
                 valid = False
                 break
-            new_indiv.league[i] = rebuilt
+            league[i] = rebuilt
 
         if valid:
-            new_indiv.fitness = new_indiv.evaluate_fitness()
+            new_indiv.genome = league # fitness is evaluated lazily (or in batch by the GA)
+            record_attempts("mutation_regenerate_team", attempt, max_attempts)
             return new_indiv
 
+    record_attempts("mutation_regenerate_team", max_attempts, max_attempts, success=False)
     raise ValueError("mutation_regenerate_team: Failed after multiple retries.")
 
 
 
 # MUTATION BALANCE TEAMS
-def mutation_balance_teams(individual, max_attempts=100):
+def mutation_balance_teams(individual, max_attempts=100, steepest=False):
     """
-    Attempts to swap one player between the strongest and weakest teams 
-    (teams with highest and lowest average skill)
+    Swaps one player between the weakest and strongest teams
+    (teams with lowest and highest average skill)
     to reduce the standard deviation of average skill.
-    Applies the change only if fitness improves.
+    Every same-position swap between the two teams is scored at once (see
+    LeagueIndividual.swap_deltas) and the best feasible one is applied, if it improves
+    the fitness. When no swap between those two teams improves it, swaps between all
+    pairs of teams are scored.
 
     Parameters:
         individual (LeagueIndividual): The individual to mutate.
-        max_attempts (int): Maximum number of attempts to find a valid mutation.
+        max_attempts (int): Maximum number of swaps applied when steepest is True.
+        steepest (bool): If True, keeps applying the best improving swap (steepest descent)
+            until no swap improves the fitness or max_attempts swaps were applied.
 
     Returns:
         LeagueIndividual: A new individual with the mutation applied.
 
     Raises:
-        ValueError: If a valid mutation cannot be produced after multiple attempts.
+        ValueError: If no swap improves the fitness.
     """
-    for _ in range(max_attempts):
-        new_indiv = copy.deepcopy(individual)
-        teams = new_indiv.league
-        team_structure = new_indiv.team_structure
-        budget = new_indiv.budget_limit
+    new_indiv = individual.copy()
+    max_swaps = max_attempts if steepest else 1
+    swaps = 0
 
-        # Sort teams by average skill
-        team_skills = sorted([(i, team.avg_skill()) for i, team in enumerate(teams)], key=lambda x: x[1])
-        # Select the weakest and strongest teams
-        low_index = team_skills[0][0]
-        high_index = team_skills[-1][0]
-        team_low = teams[low_index]
-        team_high = teams[high_index]
-
-        # Check if teams have players in common positions
-        common_positions = list(set(p.position for p in team_low.players).intersection(
-                                 set(p.position for p in team_high.players)))
-        if not common_positions:
-            continue
-        
-        # Randomly select a position and players to swap
-        pos = random.choice(common_positions)
-        candidates_low = sorted([p for p in team_low.players if p.position == pos], key=lambda p: p.skill)
-        candidates_high = sorted([p for p in team_high.players if p.position == pos], key=lambda p: -p.skill)
-
-        # Check if we can swap players
-        for pl in candidates_low:
-            for ph in candidates_high:
-                new_low = Team([ph if p.name == pl.name else p for p in team_low.players])
-                new_high = Team([pl if p.name == ph.name else p for p in team_high.players])
-
-                if not new_low.is_valid(team_structure, budget):
-                    continue
-                if not new_high.is_valid(team_structure, budget):
-                    continue
-                
-                # swap players
-                temp_league = new_indiv.league[:]
-                temp_league[low_index] = new_low
-                temp_league[high_index] = new_high
-                all_names = [p.name for t in temp_league for p in t.players]
-                if len(all_names) != len(set(all_names)):
-                    continue
+    while swaps < max_swaps:
+        genome = new_indiv.genome
+        team_skills = new_indiv.table.skill[genome].sum(axis=1)
+
+        # Best swap between the weakest and the strongest team, or else between any two teams
+        rows, cols = [int(np.argmin(team_skills))], [int(np.argmax(team_skills))]
+        deltas = new_indiv.swap_deltas(rows, cols)
+        if not deltas.min() < -1e-12:
+            rows = cols = list(range(len(genome)))
+            deltas = new_indiv.swap_deltas()
+
+        r, a, c, b = np.unravel_index(np.argmin(deltas), deltas.shape)
+        if not deltas[r, a, c, b] < -1e-12:
+            break
+
+        i, j = rows[r], cols[c]
+        new_indiv.apply_swap(i, j, genome[i, a], genome[j, b])
+        swaps += 1
+
+    if swaps == 0:
+        record_attempts("mutation_balance_teams", max_swaps, max_swaps, success=False)
+        raise ValueError("mutation_balance_teams: No swap improves the fitness.")
 
-                temp_indiv = copy.deepcopy(new_indiv)
-                temp_indiv.league[low_index] = new_low
-                temp_indiv.league[high_index] = new_high
-                new_fitness = temp_indiv.evaluate_fitness()
+    record_attempts("mutation_balance_teams", swaps, max_swaps)
+    return new_indiv
 
-                if new_fitness < new_indiv.fitness:
-                    temp_indiv.fitness = new_fitness
-                    return temp_indiv
 
-    raise ValueError("mutation_balance_teams: Failed to improve fitness after retries.")
+# steepest-descent version of mutation_balance_teams, usable as mutation_fn
+def mutation_balance_teams_steepest(individual, max_attempts=100):
+    return mutation_balance_teams(individual, max_attempts=max_attempts, steepest=True)
@@ -1,4 +1,127 @@
 import random
+import numpy as np
+
+# BATCH SELECTION
+# Each *_indices function builds its selection structure (weights, rank order) once and draws
+# all the requested parent indices in one NumPy call. The sel_* functions below are thin wrappers,
+# and breed_offspring uses the batch version (the .batch attribute) to draw a whole generation at once.
+# The draws come from a NumPy generator seeded from `random` (unless one is given), so runs stay
+# reproducible with random.seed, like the operators.
+
+def selection_rng():
+    # NumPy generator seeded from `random`
+    return np.random.default_rng(random.getrandbits(64))
+
+
+def distinct_rows(rng, n, num, k):
+    # num rows of k distinct indices in [0, n): rows with a repeated index are drawn again
+    # (rare when k is small next to n), or each row is a shuffled arange when k is over half of n
+    if 2 * k > n:
+        return rng.permuted(np.tile(np.arange(n), (num, 1)), axis=1)[:, :k]
+    rows = rng.integers(0, n, size=(num, k))
+    while True:
+        ordered = np.sort(rows, axis=1)
+        repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        if not repeated.any():
+            return rows
+        rows[repeated] = rng.integers(0, n, size=(int(repeated.sum()), k))
+
+def _inverse_fitness_weights(fitness):
+    # minimization: weight 1/fitness; individuals with fitness 0 take all the mass, invalid (inf) ones get none
+    fitness = np.asarray(fitness, dtype=np.float64)
+    zero = fitness <= 0
+    if zero.any():
+        return zero.astype(np.float64)
+    weights = np.where(np.isfinite(fitness), 1 / fitness, 0.0)
+    if not weights.any():
+        weights[:] = 1.0
+    return weights
+
+
+def _draw_weighted(weights, num, rng):
+    cumulative = np.cumsum(weights)
+    picks = np.searchsorted(cumulative, rng.random(num) * cumulative[-1], side='right')
+    return np.minimum(picks, len(weights) - 1)
+
+
+def roulette_indices(fitness, num, rng=None):
+    """
+    Draws num indices with probability proportional to 1/fitness (roulette wheel for minimization).
+
+    Args:
+        fitness (list or np.ndarray): The fitness values of the population.
+        num (int): The number of indices to draw.
+        rng (np.random.Generator, optional): Random generator. Defaults to one seeded from `random`.
+
+    Returns:
+        np.ndarray: The selected indices.
+    """
+    return _draw_weighted(_inverse_fitness_weights(fitness), num, rng or selection_rng())
+
+
+def rank_indices(fitness, num, rng=None):
+    """
+    Draws num indices with probability proportional to their rank (rank 1 for the worst fitness, n for the best).
+
+    Args:
+        fitness (list or np.ndarray): The fitness values of the population.
+        num (int): The number of indices to draw.
+        rng (np.random.Generator, optional): Random generator. Defaults to one seeded from `random`.
+
+    Returns:
+        np.ndarray: The selected indices.
+    """
+    order = np.argsort(-np.asarray(fitness, dtype=np.float64), kind='stable') # worst first
+    return order[_draw_weighted(np.arange(1, len(order) + 1, dtype=np.float64), num, rng or selection_rng())]
+
+
+def tournament_indices(fitness, num, k, rng=None):
+    """
+    Draws num indices, each the best of a tournament of k distinct individuals drawn uniformly
+    (all tournaments are drawn at once, see distinct_rows).
+
+    Args:
+        fitness (list or np.ndarray): The fitness values of the population.
+        num (int): The number of indices to draw.
+        k (int): The tournament size.
+        rng (np.random.Generator, optional): Random generator. Defaults to one seeded from `random`.
+
+    Returns:
+        np.ndarray: The selected indices.
+
+    Raises:
+        ValueError: If k is greater than the population size.
+    """
+    fitness = np.asarray(fitness, dtype=np.float64)
+    if k is None or k > len(fitness):
+        raise ValueError(f"Invalid tournament size k={k} for a population of {len(fitness)}.")
+    contestants = distinct_rows(rng or selection_rng(), len(fitness), num, k)
+    return contestants[np.arange(num), np.argmin(fitness[contestants], axis=1)]
+
+
+def sus_indices(fitness, num, rng=None):
+    """
+    Draws num indices with stochastic universal sampling: num equally spaced pointers over the
+    1/fitness wheel, so each individual is selected a number of times close to its expected value.
+    The indices are returned shuffled, so consecutive parents are not neighbours on the wheel.
+
+    Args:
+        fitness (list or np.ndarray): The fitness values of the population.
+        num (int): The number of indices to draw.
+        rng (np.random.Generator, optional): Random generator. Defaults to one seeded from `random`.
+
+    Returns:
+        np.ndarray: The selected indices.
+    """
+    rng = rng or selection_rng()
+    weights = _inverse_fitness_weights(fitness)
+    cumulative = np.cumsum(weights)
+    step = cumulative[-1] / num
+    pointers = (rng.random() + np.arange(num)) * step
+    picks = np.minimum(np.searchsorted(cumulative, pointers, side='right'), len(weights) - 1)
+    rng.shuffle(picks)
+    return picks
+
 
 # Fitness proportional selection (roulette wheel)
 def sel_roulette(population, fitness, num=1):
@@ -17,15 +140,9 @@ def sel_roulette(population, fitness, num=1):
     """
 
     # P("Selecting individual i") = fitness(i) / sum(fitness(j) for j in population) -> Maximization
-    # 1/P("Selecting individual i") -> Minimization
+    # 1/P("Selecting individual i") -> Minimization (individuals with fitness 0 are always preferred)
 
-    sum_fit = sum(fitness)
-    prob = []
-    for i in range(len(population)):
-        prob.append(1/(fitness[i] / sum_fit))
-    selected = random.choices(population, weights=prob, k=num)
-    
-    return selected
+    return [population[i] for i in roulette_indices(fitness, num)]
 
 # Ranking selection
 def sel_rank(population, fitness, num=1):
@@ -42,15 +159,8 @@ def sel_rank(population, fitness, num=1):
     Raises:
         ValueError: If the population and fitness lists are not of the same length.
     """
-    # Sort the population by fitness
-    sorted_pop = sorted(zip(population, fitness), key=lambda x: x[1], reverse=True) # Starts on Rank 1 for the worst fitness, and goes up to Rank n for the best fitness
-    sum_rank = sum(range(1, len(sorted_pop) + 1)) # Sum of ranking indexes
-    prob = []
-    for i in range(len(sorted_pop)):
-        prob.append((i + 1) / sum_rank)
-    selected = random.choices([x[0] for x in sorted_pop], weights=prob, k=num)
-
-    return selected
+    # Rank 1 for the worst fitness, up to rank n for the best fitness
+    return [population[i] for i in rank_indices(fitness, num)]
 
 # Tournament selection
 def sel_tournament(population, fitness, k, num=1):
@@ -69,14 +179,28 @@ def sel_tournament(population, fitness, k, num=1):
         ValueError: If the population and fitness lists are not of the same length.
         ValueError: If k is greater than the population size.
     """
-    selected = []
-    
-    for n in range(num):
-        # Randomly select k individuals from the population
-        tournament = random.sample(list(zip(population, fitness)), k)
-        tournament.sort(key=lambda x: x[1])
-        # Select the best individual from the tournament
-        best_individual = tournament[0]
-        selected.append(best_individual[0])
-
-    return selected
\ No newline at end of file
+    # Best individual of each of num tournaments of k random individuals
+    return [population[i] for i in tournament_indices(fitness, num, k)]
+
+
+# Stochastic universal sampling
+def sel_sus(population, fitness, num=1):
+    """
+    Selects individuals from the population with stochastic universal sampling over the
+    same 1/fitness weights as the roulette wheel, with lower variance than num independent spins.
+    Args:
+        population (list): The population of individuals.
+        fitness (list): The fitness values of the individuals in the population.
+        num (int): The number of individuals to select.
+
+    Returns:
+        list: A list of selected individuals.
+    """
+    return [population[i] for i in sus_indices(fitness, num)]
+
+
+# batch versions used by breed_offspring
+sel_roulette.batch = roulette_indices
+sel_rank.batch = rank_indices
+sel_tournament.batch = tournament_indices
+sel_sus.batch = sus_indices
\ No newline at end of file
@@ -1,11 +1,178 @@
 # algorithm.py
 import random
-from copy import deepcopy
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from solutions.GASolution import GASolution
-from utils.Classes import LeagueIndividual
+from algorithms.local_search import hill_climb, swaps_per_step
+from algorithms.GA_selection import selection_rng
+from utils.Classes import LeagueIndividual, PlayerTable
+from utils.fitness import FitnessCache, evaluate_pending, league_signatures
+from utils.metrics import GAHistory, take_operator_attempts, merge_operator_attempts
+from utils.checkpoint import save_checkpoint, load_checkpoint
+from utils.stopping import StoppingCriteria
+
+# CONSTRUCTIVE LEAGUE GENERATION
+class _SalaryPool:
+    def __init__(self, ids, salaries):
+
+        """
+        Available players of one position, sorted from cheapest, with Fenwick trees of the number
+        and the total salary of the players still available. Taking a player, putting it back, the
+        total salary of the k cheapest available players and the k-th cheapest available player
+        are all O(log n), so no array is rebuilt while a league is filled.
+        """
+
+        order = np.argsort(salaries, kind='stable')
+        self.ids = np.asarray(ids)[order].tolist()
+        self.salaries = np.asarray(salaries, dtype=np.float64)[order]
+        self.size = n = len(order)
+        self._step = 1 << (n.bit_length() - 1) if n else 0
+
+        # trees built in O(n): each node adds itself to its parent
+        self._count = [0] + [1] * n
+        self._sum = [0.0] + self.salaries.tolist()
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self._count[parent] += self._count[i]
+                self._sum[parent] += self._sum[i]
+
+    def copy(self):
+        pool = object.__new__(_SalaryPool)
+        pool.ids, pool.salaries, pool.size, pool._step = self.ids, self.salaries, self.size, self._step
+        pool._count, pool._sum = list(self._count), list(self._sum)
+        return pool
+
+    def _update(self, idx, count, salary):
+        i = idx + 1
+        while i < len(self._count):
+            self._count[i] += count
+            self._sum[i] += salary
+            i += i & -i
+
+    def _find(self, k):
+        # index of the (k+1)-th cheapest available player and the total salary of the k cheapest
+        pos, total, step = 0, 0.0, self._step
+        while step:
+            nxt = pos + step
+            if nxt < len(self._count) and self._count[nxt] <= k:
+                pos, k, total = nxt, k - self._count[nxt], total + self._sum[nxt]
+            step >>= 1
+        return pos, total
+
+    # total salary of the k cheapest available players
+    def cheapest(self, k):
+        return self._find(k)[1] if k <= self.size else np.inf
+
+    # number of available players with a salary of at most `salary`
+    def count_at_most(self, salary):
+        i, count = int(np.searchsorted(self.salaries, salary, side='right')), 0
+        while i:
+            count += self._count[i]
+            i -= i & -i
+        return count
+
+    # number of cheapest available players that can be picked while the k cheapest of the others fit in budget
+    def feasible(self, k, budget):
+        if self.size <= k or self.cheapest(k + 1) > budget:
+            return 0
+        return self.count_at_most(budget - self.cheapest(k))
+
+    # removes the (rank+1)-th cheapest available player, returns its index in the pool
+    def take(self, rank):
+        idx = self._find(rank)[0]
+        self._update(idx, -1, -self.salaries[idx])
+        self.size -= 1
+        return idx
+
+    def put_back(self, idx):
+        self._update(idx, 1, self.salaries[idx])
+        self.size += 1
+
+
+def construct_league(table, team_structure, budget_limit, num_teams, max_attempts=100, team_retries=10):
+
+    """
+    Builds a valid league directly instead of sampling and rejecting whole leagues.
+    Each slot of each team is filled with a random player among those that still leave
+    a feasible completion: the cheapest available players must be able to fill the rest of
+    the team within its budget, and the rest of the league within the budget of the
+    remaining teams. Position pools are kept sorted by salary (see _SalaryPool) so these
+    bounds cost O(log n) per slot, and a league costs O(num_teams * log n) besides building the pools once.
+    The bounds are necessary conditions only: a team that cannot be completed is rebuilt, and the
+    league is restarted if the team still cannot be completed after team_retries tries.
+
+    Args:
+        table (PlayerTable): The player table.
+        team_structure (dict): A dictionary defining the structure of each team.
+        budget_limit (float): The budget limit of each team.
+        num_teams (int): The number of teams in the league.
+        max_attempts (int): Maximum number of restarts of the league.
+        team_retries (int): Number of tries to build each team before restarting the league.
+
+    Returns:
+        tuple: The genome of the league (or None if every attempt failed) and the number of attempts used.
+    """
+
+    slots = [pos for pos, count in team_structure.items() for _ in range(count)]
+    ranges = {pos: table.position_ranges[pos] for pos in team_structure}
+    all_pools = {pos: _SalaryPool(range(*ranges[pos]), table.salary[slice(*ranges[pos])]) for pos in team_structure}
+
+    for attempt in range(1, max_attempts + 1):
+        pools = {pos: pool.copy() for pos, pool in all_pools.items()}
+        genome = []
+
+        for t in range(num_teams):
+            later_teams = num_teams - t - 1
+
+            # a team that gets stuck is rebuilt (its players are put back) before restarting the league
+            for _ in range(team_retries):
+                random.shuffle(slots)
+                taken = []
+                team_salary = 0.0
+
+                for s, pos in enumerate(slots):
+                    # players still needed after this slot, in this team and in the whole league
+                    needed_team = {q: slots[s + 1:].count(q) for q in team_structure}
+                    needed_league = {q: needed_team[q] + later_teams * team_structure[q] for q in team_structure}
+                    budget_team = budget_limit - team_salary
+                    budget_league = budget_team + later_teams * budget_limit
+
+                    # cheapest way to fill the other positions
+                    for q in team_structure:
+                        if q != pos:
+                            budget_team -= pools[q].cheapest(needed_team[q])
+                            budget_league -= pools[q].cheapest(needed_league[q])
+
+                    pool = pools[pos]
+                    feasible = min(pool.feasible(needed_team[pos], budget_team),
+                                   pool.feasible(needed_league[pos], budget_league))
+                    if feasible == 0:
+                        break
+
+                    idx = pool.take(random.randrange(feasible))
+                    taken.append((pos, idx))
+                    team_salary += pool.salaries[idx]
+
+                if len(taken) == len(slots):
+                    genome.append([pools[pos].ids[idx] for pos, idx in taken])
+                    break
+                for pos, idx in taken:
+                    pools[pos].put_back(idx)
+
+            if len(genome) != t + 1:
+                break
+
+        if len(genome) == num_teams:
+            return np.array(genome, dtype=np.int32), attempt
+
+    return None, max_attempts
+
 
 # POPULATION GENERATION
-def generate_initial_population(size, players_by_position, team_structure, budget_limit, num_teams):
+def generate_initial_population(size, players_by_position, team_structure, budget_limit, num_teams,
+                                constructive=True, max_attempts=None, return_attempts=False):
 
     """
     Generate a random initial population of LeagueIndividuals.
@@ -13,24 +180,300 @@ def generate_initial_population(size, players_by_position, team_structure, budge
 
     Args:
         size (int): The number of individuals to generate.
-        players_by_position (dict): A dictionary where keys are positions and values are lists of Player objects.
+        players_by_position (dict or PlayerTable): A dictionary where keys are positions and values are lists of Player objects,
+            or the PlayerTable shared by every individual.
         team_structure (dict): A dictionary defining the structure of each team (e.g., number of players per position).
         budget_limit (float): The budget limit for the league.
         num_teams (int): The number of teams in the league.
+        constructive (bool, optional): If True, leagues are built with construct_league, otherwise random leagues
+            are sampled and rejected when a team is over budget. Defaults to True.
+        max_attempts (int, optional): Maximum number of attempts in total. Defaults to max(1000, 10 * size).
+        return_attempts (bool, optional): If True, also returns the number of attempts used. Defaults to False.
+
+    Returns:
+        list[GASolution]: The population, or a tuple (population, attempts) if return_attempts is True.
     """
 
+    table = PlayerTable.from_players_by_position(players_by_position)
     population = []
     attempts = 0
-    max_attempts = 1000 # avoid infinite loop if unable to generate valid leagues
+    if max_attempts is None:
+        max_attempts = max(1000, 10 * size) # avoid infinite loop if unable to generate valid leagues
 
     while len(population) < size and attempts < max_attempts:
-        indiv = LeagueIndividual(players_by_position, team_structure, budget_limit, num_teams)
+        if constructive:
+            genome, used = construct_league(table, team_structure, budget_limit, num_teams,
+                                            max_attempts=min(100, max_attempts - attempts))
+            attempts += used
+            if genome is None:
+                continue
+            indiv = LeagueIndividual(table, team_structure, budget_limit, num_teams, genome=genome)
+        else:
+            indiv = LeagueIndividual(table, team_structure, budget_limit, num_teams)
+            attempts += 1
         if indiv.league is not None: # proceed if the league is valid
             population.append(GASolution(indiv))
-        attempts += 1
 
+    if return_attempts:
+        return population, attempts
     return population
 
+# OFFSPRING GENERATION
+def breed_offspring(population, fitnesses, num_offspring, selection_fn, crossover_fn, mutation_fn,
+                    mutation_rate=0.2, xo_prob=0.9, k_tournament=None, stats=None, draw_parents=None):
+
+    """
+    Produces offspring from a population: selects pairs of parents, applies crossover
+    with probability xo_prob and mutates each child with probability mutation_rate.
+    Pairs whose crossover fails are skipped, children whose mutation fails are kept unmutated.
+
+    Args:
+        population (list[GASolution]): The current population.
+        fitnesses (list[float]): The fitness of each individual of the population.
+        num_offspring (int): Minimum number of children to produce (children are produced in pairs).
+        selection_fn (Callable): Function used for selecting individuals.
+        crossover_fn (Callable): Function used for crossover between two parents.
+        mutation_fn (Callable): Function used for mutating an individual.
+        mutation_rate (float, optional): Probability of applying mutation. Defaults to 0.2.
+        xo_prob (float, optional): Probability of applying crossover. Defaults to 0.9.
+        k_tournament (int, optional): Number of individuals to select in the tournament selection. Defaults to None.
+        stats (dict, optional): If given, the time spent in selection, crossover and mutation and the number
+            of ValueErrors raised by the crossover and mutation operators are added to it.
+        draw_parents (Callable, optional): Function returning num parent indices, used instead of selection_fn
+            (for example by the steady-state GA, which keeps its selection structures up to date). Defaults to None.
+
+    Returns:
+        list[GASolution]: The children.
+    """
+
+    if stats is None:
+        stats = {}
+    for key in ('selection_time', 'crossover_time', 'mutation_time', 'crossover_errors', 'mutation_errors'):
+        stats.setdefault(key, 0)
+    clock = time.perf_counter
+
+    offspring = []
+    is_tournament = selection_fn.__name__ == "sel_tournament"
+
+    # batch selectors draw the parents of every pair at once (more are drawn if crossovers fail)
+    batch = getattr(selection_fn, 'batch', None)
+    if draw_parents is not None:
+        batch, is_tournament = (lambda fitnesses, num, rng: draw_parents(num)), False
+    rng = selection_rng() if batch is not None else None # seeded from `random`, reproducible with random.seed
+    num_parents = 2 * ((num_offspring + 1) // 2)
+    parent_indices = []
+
+    while len(offspring) < num_offspring:
+        start = clock()
+        if batch is not None:
+            if not parent_indices:
+                if is_tournament:
+                    drawn = batch(fitnesses, num_parents, k_tournament, rng=rng)
+                else:
+                    drawn = batch(fitnesses, num_parents, rng=rng)
+                parent_indices = drawn.tolist()[::-1]
+            parents = population[parent_indices.pop()], population[parent_indices.pop()]
+        # check if the selection function is tournament selection
+        elif is_tournament:
+            parents = selection_fn(population, fitnesses, k=k_tournament, num=2)
+        else: # otherwise use the default selection function
+            parents = selection_fn(population, fitnesses, num=2)
+        stats['selection_time'] += clock() - start
+
+        parent1, parent2 = parents
+
+        # crossover parents to create children
+        if random.random() < xo_prob:
+            start = clock()
+            try:
+                child1, child2 = parent1.crossover(parent2, crossover_fn)
+            except ValueError:
+                stats['crossover_errors'] += 1
+                continue
+            finally:
+                stats['crossover_time'] += clock() - start
+        else:
+            child1, child2 = GASolution(parent1.individual.copy()), GASolution(parent2.individual.copy())
+
+        # mutate children (offspring)
+        start = clock()
+        if random.random() < mutation_rate:
+            try:
+                child1 = child1.mutate(mutation_fn)
+            except ValueError:
+                stats['mutation_errors'] += 1
+
+        if random.random() < mutation_rate:
+            try:
+                child2 = child2.mutate(mutation_fn)
+            except ValueError:
+                stats['mutation_errors'] += 1
+        stats['mutation_time'] += clock() - start
+
+        offspring.extend([child1, child2])
+
+    return offspring
+
+
+# POPULATION <-> ARRAYS
+def population_to_arrays(population):
+
+    """
+    Packs a population as arrays, to send it to other processes or save it:
+    the genomes of shape (population, num_teams, players_per_team) and the fitness values.
+    """
+
+    genomes = np.stack([ind.individual.genome for ind in population])
+    fitnesses = np.array([ind.fitness() for ind in population], dtype=np.float64)
+    return genomes, fitnesses
+
+
+def population_from_arrays(genomes, fitnesses, table, team_structure, budget_limit, num_teams):
+
+    """
+    Rebuilds a population of GASolutions from arrays of genomes and fitness values
+    (see population_to_arrays). The fitness values are reused, not evaluated again.
+    """
+
+    population = []
+    for genome, fitness in zip(genomes, np.asarray(fitnesses).tolist()):
+        indiv = LeagueIndividual(table, team_structure, budget_limit, num_teams, genome=genome)
+        indiv.fitness = fitness
+        population.append(GASolution(indiv))
+    return population
+
+
+# PARALLEL OFFSPRING GENERATION
+# state of each worker process, set once by _init_worker so the player data is not sent with every task
+_worker_state = {}
+
+def _init_worker(players_by_position, team_structure, budget_limit, num_teams, operators):
+    _worker_state['problem'] = (PlayerTable.from_players_by_position(players_by_position),
+                                team_structure, budget_limit, num_teams)
+    _worker_state['operators'] = operators
+    _worker_state['cache'] = FitnessCache()
+
+
+def _breed_worker(genomes, fitnesses, num_offspring, seed):
+    # every task has its own seed, so the result does not depend on which worker runs it
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+    population = population_from_arrays(genomes, fitnesses, *_worker_state['problem'])
+    stats = {}
+    take_operator_attempts()
+    offspring = breed_offspring(population, fitnesses.tolist(), num_offspring, stats=stats,
+                                **_worker_state['operators'])[:num_offspring] # children come in pairs
+
+    start = time.perf_counter()
+    evaluate_pending(offspring, _worker_state['cache'])
+    stats['evaluation_time'] = time.perf_counter() - start
+
+    return population_to_arrays(offspring) + (stats, take_operator_attempts())
+
+
+def _parallel_offspring(executor, workers, population, num_offspring, problem, stats, attempts):
+    # population sent as one array of player ids, split in one task per worker
+    genomes, fitnesses = population_to_arrays(population)
+    counts = [num_offspring // workers + (w < num_offspring % workers) for w in range(workers)]
+    counts = [count for count in counts if count > 0]
+    seeds = [random.getrandbits(64) for _ in counts]
+
+    offspring = []
+    for child_genomes, child_fitnesses, worker_stats, worker_attempts in executor.map(
+            _breed_worker, [genomes] * len(counts), [fitnesses] * len(counts), counts, seeds):
+        offspring.extend(population_from_arrays(child_genomes, child_fitnesses, *problem))
+        for key, value in worker_stats.items():
+            stats[key] = stats.get(key, 0) + value
+        merge_operator_attempts(attempts, worker_attempts)
+    return offspring
+
+
+# LOCAL SEARCH STAGE
+def _local_search_stage(population, fitnesses, k, max_evaluations, max_ms, stats):
+    # improves the k best individuals of the population in place (population and fitnesses)
+    start = time.perf_counter()
+    deadline = None if max_ms is None else start + max_ms / 1000
+    swaps_scored = improved_count = 0
+
+    for idx in np.argsort(fitnesses, kind='stable')[:k].tolist():
+        remaining_ms = None if deadline is None else (deadline - time.perf_counter()) * 1000
+        if remaining_ms is not None and remaining_ms <= 0:
+            break
+        improved, scored = hill_climb(population[idx].individual, max_evaluations, remaining_ms)
+        swaps_scored += scored
+        if improved is not population[idx].individual:
+            population[idx] = GASolution(improved)
+            fitnesses[idx] = improved.fitness
+            improved_count += 1
+
+    stats['local_search_time'] = time.perf_counter() - start
+    stats['local_search_swaps_scored'] = swaps_scored
+    stats['local_search_improved'] = improved_count
+
+
+# GENERATIONAL STEP
+def _next_generation(population, fitnesses, population_size, operators, fitness_cache, elitism=True, stats=None,
+                     executor=None, workers=None, problem=None, attempts=None, local_search_k=0,
+                     local_search_evaluations=10000, local_search_ms=None):
+    # one generation of the generational loop, shared by genetic_algorithm and the islands of
+    # island_genetic_algorithm: breeds the offspring (in the pool of executor, if given), evaluates them,
+    # improves the best ones by local search and lets the elite replace the worst child;
+    # returns the new population, its fitnesses and the number of evaluations used
+    stats = {} if stats is None else stats
+
+    # get the best individual of the current generation
+    if elitism:
+        best_individual = population[int(np.argmin(fitnesses))]
+
+    if executor is None:
+        new_population = breed_offspring(population, fitnesses.tolist(), population_size, stats=stats, **operators)
+    else:
+        new_population = _parallel_offspring(executor, workers, population, population_size, problem,
+                                             stats, attempts)
+    # children come in pairs: drop the extra one before the elite replaces the worst child
+    new_population = new_population[:population_size]
+
+    start = time.perf_counter()
+    new_fitnesses = evaluate_pending(new_population, fitness_cache)
+    stats['evaluation_time'] = stats.get('evaluation_time', 0) + time.perf_counter() - start
+    evaluations = len(new_population)
+
+    # memetic stage: hill climb on the best offspring
+    if local_search_k:
+        _local_search_stage(new_population, new_fitnesses, local_search_k, local_search_evaluations,
+                            local_search_ms, stats)
+        evaluations += stats['local_search_swaps_scored'] # each scored swap counts as an evaluation
+
+    if elitism:
+        worst_idx = int(np.argmax(new_fitnesses))
+        new_population[worst_idx] = best_individual
+        new_fitnesses[worst_idx] = best_individual.fitness()
+
+    return new_population, new_fitnesses, evaluations
+
+
+# GENERATION METRICS
+def _record_generation(history, callbacks, generation, population, fitnesses, evaluations, stats, attempts):
+    # fitness summary and diversity (fraction of distinct leagues) of the new population
+    genomes = np.stack([ind.individual.genome for ind in population])
+    finite = fitnesses[np.isfinite(fitnesses)]
+    stats['best'] = fitnesses.min()
+    stats['mean'] = finite.mean() if len(finite) else np.inf
+    stats['std'] = finite.std() if len(finite) else np.nan
+    stats['evaluations'] = evaluations
+    stats['diversity'] = len(set(league_signatures(genomes))) / len(population)
+
+    # retries used by the operators, out of their max_attempts
+    for name, counts in attempts.items():
+        for key, value in counts.items():
+            stats[f"{name}_{key}"] = value
+
+    history.append(**stats)
+    for callback in callbacks:
+        callback(generation, population, fitnesses, stats)
+
+
 # MAIN GENETIC ALGORITHM FUNCTION
 def genetic_algorithm(
     players_by_position, 
@@ -46,19 +489,36 @@ def genetic_algorithm(
     xo_prob=0.9, 
     elitism=True, 
     k_tournament=None, 
-    verbose=True 
+    verbose=True,
+    fitness_cache=None,
+    workers=None,
+    max_time=None,
+    max_evaluations=None,
+    stagnation=None,
+    target_fitness=None,
+    callbacks=None,
+    history=None,
+    checkpoint_path=None,
+    checkpoint_interval=10,
+    resume_from=None,
+    local_search_k=0,
+    local_search_evaluations=10000,
+    local_search_ms=None
 ):
-    
+
     """
     Executes a genetic algorithm to optimize a population of possible solutions.
+    The run stops as soon as one of the stopping criteria that are set fires
+    (generations, max_time, max_evaluations, stagnation, target_fitness; see utils.stopping).
 
     Args:
-        players_by_position (dict): A dictionary where keys are positions and values are lists of Player objects.
+        players_by_position (dict or PlayerTable): A dictionary where keys are positions and values are lists of Player objects,
+            or the PlayerTable shared by every individual.
         team_structure (dict): A dictionary defining the structure of each team.
         budget_limit (float): The budget limit for the league.
         num_teams (int): The number of teams in the league.
         population_size (int): list of individuals (randomly generated solutions).
-        generations (int): The number of generations to evolve.
+        generations (int): The maximum number of generations to evolve (None for no limit on generations).
         selection_fn (Callable): Function used for selecting individuals.
         crossover_fn (Callable): Function used for crossover between two parents.
         mutation_fn (Callable): Function used for mutating an individual.
@@ -67,68 +527,136 @@ def genetic_algorithm(
         elitism (bool, optional): If True, carries the best individual to the next generation. Defaults to True.
         k_tournament (int, optional): Number of individuals to select in the tournament selection. Defaults to None.
         verbose (bool, optional): If True, prints detailed logs for debugging. Defaults to True.
+        fitness_cache (FitnessCache, optional): Cache of fitness values shared across generations (and runs, if the
+            same cache is passed to several runs). Defaults to a new cache for this run.
+        workers (int, optional): If greater than 1, offspring are produced by a pool of this many processes.
+            The player data is sent once to each process, and each task gets a seed drawn from `random`,
+            so runs are reproducible with random.seed. The operators must be module-level functions.
+            Defaults to None (single process).
+        max_time (float, optional): Time budget of the run in seconds. Defaults to None.
+        max_evaluations (int, optional): Maximum number of fitness evaluations (individuals created, plus the swaps
+            scored by the local-search stage). Defaults to None.
+        stagnation (int, optional): Stop after this many generations without improvement of the best fitness.
+            Defaults to None.
+        target_fitness (float, optional): Stop as soon as the best fitness reaches this value. Defaults to None.
+        callbacks (list[Callable], optional): Functions called after each generation as
+            callback(generation, population, fitnesses, metrics), where metrics is the dict recorded in history.
+        history (GAHistory, optional): History where the metrics of each generation are recorded: best, mean and
+            std of the fitness, number of fitness evaluations so far, diversity (fraction of distinct leagues), time spent in selection, crossover, mutation and evaluation,
+            ValueErrors swallowed from crossover and mutation, and for each operator the calls, attempts used,
+            max_attempts and failed calls. Defaults to a new GAHistory.
+        checkpoint_path (str, optional): If given, the state of the run (population as player-id arrays, elite,
+            counters, random generator states and history) is saved to this .npz file every checkpoint_interval
+            generations and when the run stops. See utils.checkpoint.
+        checkpoint_interval (int, optional): Number of generations between checkpoints. Defaults to 10.
+        resume_from (str, optional): Path of a checkpoint to continue from instead of generating an initial
+            population. The run continues with the saved population, counters, time, history and random state,
+            under the stopping criteria given to this call. Defaults to None.
+        local_search_k (int, optional): Number of best offspring improved each generation by a hill climb of
+            same-position swaps (memetic stage, see algorithms.local_search). 0 disables it. Defaults to 0.
+        local_search_evaluations (int, optional): Maximum number of swaps scored by the hill climb of each
+            individual. Must cover at least one step (see algorithms.local_search.swaps_per_step), otherwise
+            a ValueError is raised. Defaults to 10000.
+        local_search_ms (float, optional): Time budget of the local-search stage of each generation,
+            in milliseconds. Defaults to None (no time limit).
 
     Returns:
-        LeagueIndividual: The best individual found after the specified number of generations.
+        GASolution: The best individual found. Its stop_reason attribute holds the criterion that
+        stopped the run ('generations', 'max_time', 'max_evaluations', 'stagnation' or 'target_fitness'),
+        its elapsed attribute the running time of the run in seconds (including the time before a resumed
+        checkpoint), and its history attribute the GAHistory of the run.
     """
 
-    # Generate the initial population
-    population = generate_initial_population(
-        population_size, players_by_position, team_structure, budget_limit, num_teams
-    )
+    stopping = StoppingCriteria(generations, max_time=max_time, max_evaluations=max_evaluations,
+                                stagnation=stagnation, target_fitness=target_fitness)
 
-    for generation in range(generations):
-        fitnesses = [ind.fitness() for ind in population] # get fitness of each individual
+    if fitness_cache is None:
+        fitness_cache = FitnessCache()
+    callbacks = callbacks or []
 
-        # get the best individual of the current generation
-        if elitism:
-            best_individual = min(population, key=lambda x: x.fitness())
+    table = PlayerTable.from_players_by_position(players_by_position)
+    problem = (table, team_structure, budget_limit, num_teams)
+    operators = dict(selection_fn=selection_fn, crossover_fn=crossover_fn, mutation_fn=mutation_fn,
+                     mutation_rate=mutation_rate, xo_prob=xo_prob, k_tournament=k_tournament)
 
-        new_population = []
+    if resume_from is not None:
+        # Continue a checkpointed run
+        checkpoint = load_checkpoint(resume_from)
+        if checkpoint['genomes'].shape[1:] != (num_teams, sum(team_structure.values())):
+            raise ValueError(f"Checkpoint {resume_from} does not match the league shape of this problem.")
 
-        while len(new_population) < population_size:
-            # check if the selection function is tournament selection
-            if selection_fn.__name__ == "sel_tournament":
-                parents = selection_fn(population, fitnesses, k=k_tournament, num=2)
-            else: # otherwise use the default selection function
-                parents = selection_fn(population, fitnesses, num=2)
+        population = population_from_arrays(checkpoint['genomes'], checkpoint['fitnesses'], *problem)
+        generation, evaluations = checkpoint['generation'], checkpoint['evaluations']
+        if history is None:
+            history = checkpoint['history']
+        stopping.resume(checkpoint['elapsed'], checkpoint['stopping'] or stopping.state())
 
-            parent1, parent2 = parents
+        if verbose:
+            print(f"Resumed from {resume_from} at generation {generation}")
+    else:
+        # Generate the initial population
+        population, attempts = generate_initial_population(
+            population_size, table, team_structure, budget_limit, num_teams, return_attempts=True
+        )
+        evaluations = len(population)
+        generation = 0
 
-            # crossover parents to create children
-            if random.random() < xo_prob:
-                try:
-                    child1, child2 = parent1.crossover(parent2, crossover_fn)
-                except:
-                    continue
-            else:
-                child1, child2 = deepcopy(parent1), deepcopy(parent2)
+        if verbose:
+            print(f"Initial population: {len(population)} individuals in {attempts} attempts")
 
-            # mutate children (offspring)
-            if random.random() < mutation_rate:
-                try:
-                    child1 = child1.mutate(mutation_fn)
-                except:
-                    pass
+    if history is None:
+        history = GAHistory(capacity=generations or 64) # preallocated for the whole run when its length is known
 
-            if random.random() < mutation_rate:
-                try:
-                    child2 = child2.mutate(mutation_fn)
-                except:
-                    pass
+    # fail before the run rather than skipping the local search silently
+    if local_search_k and swaps_per_step(population[0].individual) > local_search_evaluations:
+        raise ValueError(f"local_search_evaluations={local_search_evaluations} is smaller than one hill-climb "
+                         f"step ({swaps_per_step(population[0].individual)} swaps scored).")
 
-            new_population.extend([child1, child2])
+    executor = None
+    if workers is not None and workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(*problem, operators))
 
-        if elitism:
-            worst_idx = max(range(len(new_population)), key=lambda i: new_population[i].fitness())
-            new_population[worst_idx] = best_individual
+    fitnesses = evaluate_pending(population, fitness_cache) # get fitness of each individual (one batched pass)
+    stopping_state = stopping.state() # counters before the check of the current generation, saved in checkpoints
 
-        population = new_population[:population_size]
+    take_operator_attempts() # discard attempts recorded before the run
 
-        if verbose:
-            best_fitness = min(ind.fitness() for ind in population)
-            avg_fitness = sum(ind.fitness() for ind in population) / len(population)
-            print(f"Generation {generation+1:03d} | Best: {best_fitness:.4f} | Avg: {avg_fitness:.4f}")
+    try:
+        while stopping.update(generation, fitnesses.min(), evaluations) is None:
+            stats = {}
+            attempts = {}
+
+            population, fitnesses, used = _next_generation(
+                population, fitnesses, population_size, operators, fitness_cache, elitism, stats, executor, workers,
+                problem, attempts, local_search_k, local_search_evaluations, local_search_ms)
+            evaluations += used
+            generation += 1
+
+            merge_operator_attempts(attempts, take_operator_attempts())
+            _record_generation(history, callbacks, generation, population, fitnesses, evaluations, stats,
+                               attempts)
+
+            if verbose:
+                print(f"Generation {generation:03d} | Best: {fitnesses.min():.4f} | Avg: {fitnesses.mean():.4f}")
+
+            stopping_state = stopping.state()
+            if checkpoint_path is not None and generation % checkpoint_interval == 0:
+                save_checkpoint(checkpoint_path, population_to_arrays(population)[0], fitnesses, generation,
+                                evaluations, stopping.elapsed(), stopping_state, history)
+
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if checkpoint_path is not None:
+        save_checkpoint(checkpoint_path, population_to_arrays(population)[0], fitnesses, generation,
+                        evaluations, stopping.elapsed(), stopping_state, history)
+
+    if verbose:
+        print(f"Stopped after {generation} generations ({stopping.reason})")
 
-    best = min(population, key=lambda x: x.fitness())
+    best = population[int(np.argmin(fitnesses))]
+    best.stop_reason = stopping.reason
+    best.elapsed = stopping.elapsed()
+    best.history = history
     return best
@@ -0,0 +1,157 @@
+# exact.py
+import itertools
+import time
+import numpy as np
+from utils.Classes import LeagueIndividual, PlayerTable
+
+# CANDIDATE TEAMS
+def _candidate_teams(table, team_structure, available, required_id=None, min_id=-1):
+    # every team that can be built from the available players, as ids with their skill and salary sums;
+    # teams must contain required_id (if given) and only players with ids greater than min_id
+    columns, skills, salaries = [], [], []
+    for pos, count in team_structure.items():
+        ids = table.free_ids(pos, ~available)
+        combos = np.array(list(itertools.combinations(ids.tolist(), count)), dtype=np.int32).reshape(-1, count)
+        if required_id is not None and table.position_of(required_id) == pos:
+            combos = combos[(combos == required_id).any(axis=1)]
+        combos = combos[(combos > min_id).all(axis=1)]
+        columns.append(combos)
+        skills.append(table.skill[combos].sum(axis=1))
+        salaries.append(table.salary[combos].sum(axis=1))
+
+    # cartesian product of the combinations of each position
+    grids = np.meshgrid(*[np.arange(len(c)) for c in columns], indexing='ij')
+    picks = [grid.ravel() for grid in grids]
+    teams = np.hstack([c[p] for c, p in zip(columns, picks)]) if picks else np.empty((0, 0), dtype=np.int32)
+    team_skills = sum(s[p] for s, p in zip(skills, picks))
+    team_salaries = sum(s[p] for s, p in zip(salaries, picks))
+    return teams, np.asarray(team_skills, dtype=np.float64), np.asarray(team_salaries, dtype=np.float64)
+
+
+# BRANCH AND BOUND
+def branch_and_bound(players_by_position, team_structure, budget_limit, num_teams, initial=None, max_time=None,
+                     verbose=True):
+
+    """
+    Finds a league with the lowest possible fitness (standard deviation of the average skills of the
+    teams) by branch and bound, to measure the optimality gap of the genetic algorithms on small instances.
+
+    Teams are built one at a time. Team permutations are not enumerated: teams are built in increasing
+    order of their smallest player id (when every player must be used, each team takes the lowest
+    player id still available). A branch is pruned when a team exceeds the budget, when the players
+    left cannot fit in the budget of the remaining teams, or when a lower bound of the squared deviations
+    of the team skill sums is not better than the best league found:
+        - when every player must be used, the total skill (and so the mean team) is fixed, and the
+          remaining teams are at best equal (or as equal as integer sums allow, if skills are integers);
+        - otherwise, the squared deviations of the teams built so far around their own mean.
+    Children are explored in increasing order of their bound.
+
+    Args:
+        players_by_position (dict or PlayerTable): A dictionary where keys are positions and values are lists of Player objects,
+            or the PlayerTable shared by every individual.
+        team_structure (dict): A dictionary defining the structure of each team.
+        budget_limit (float): The budget limit for a team.
+        num_teams (int): The number of teams in the league.
+        initial (LeagueIndividual, optional): A valid league (for example the best of a GA run), used as the
+            first incumbent so the search only looks for strictly better leagues. Defaults to None.
+        max_time (float, optional): Time budget in seconds. If it runs out, the best league found is returned
+            without proof of optimality. Defaults to None.
+        verbose (bool, optional): If True, prints the result. Defaults to True.
+
+    Returns:
+        tuple: The best LeagueIndividual found (None if no valid league exists) and a dict with its
+        'fitness', 'optimal' (True if proven optimal), the number of 'nodes' explored and 'time_sec'.
+
+    Raises:
+        ValueError: If there are not enough players of some position.
+    """
+
+    start = time.perf_counter()
+    table = PlayerTable.from_players_by_position(players_by_position)
+    team_size = sum(team_structure.values())
+    sizes = {pos: table.position_ranges[pos][1] - table.position_ranges[pos][0] for pos in team_structure}
+    if any(sizes[pos] < count * num_teams for pos, count in team_structure.items()):
+        raise ValueError("Not enough players to fill every team.")
+
+    available = np.zeros(len(table), dtype=bool)
+    for pos in team_structure:
+        available[slice(*table.position_ranges[pos])] = True
+
+    # every player is used: the total skill and salary of the league are fixed
+    uses_all = all(sizes[pos] == count * num_teams for pos, count in team_structure.items())
+    integral = bool(np.all(table.skill[available] == np.round(table.skill[available])))
+    target = table.skill[available].sum() / num_teams
+
+    # lowest squared deviations of teams_left teams sharing the skill left (an array, one value per branch)
+    def remaining_bound(skill_left, teams_left):
+        if teams_left == 0:
+            return np.zeros_like(skill_left)
+        if integral:
+            q, r = np.divmod(np.round(skill_left), teams_left)
+            return r * (q + 1 - target) ** 2 + (teams_left - r) * (q - target) ** 2
+        return teams_left * (skill_left / teams_left - target) ** 2
+
+    # incumbent, as the sum of squared deviations of the team skill sums
+    best = {'ss': np.inf, 'genome': None}
+    if initial is not None and np.isfinite(initial.fitness):
+        best['ss'] = (initial.fitness * team_size) ** 2 * num_teams
+        best['genome'] = np.array(initial.genome)
+
+    chosen = []
+    nodes = 0
+    timed_out = False
+
+    def search(t, min_id, sum_a, sumsq_a, skill_left, salary_left):
+        nonlocal nodes, timed_out
+        nodes += 1
+        if max_time is not None and time.perf_counter() - start > max_time:
+            timed_out = True
+            return
+
+        if uses_all:
+            teams, skills, salaries = _candidate_teams(table, team_structure, available,
+                                                       required_id=int(np.flatnonzero(available)[0]))
+        else:
+            teams, skills, salaries = _candidate_teams(table, team_structure, available, min_id=min_id)
+
+        teams_left = num_teams - t - 1
+        feasible = salaries <= budget_limit
+        if uses_all:
+            feasible &= salary_left - salaries <= teams_left * budget_limit
+            bounds = sumsq_a - 2 * target * sum_a + t * target ** 2 + (skills - target) ** 2
+            bounds = bounds + remaining_bound(skill_left - skills, teams_left)
+        else:
+            bounds = sumsq_a + skills ** 2 - (sum_a + skills) ** 2 / (t + 1)
+
+        candidates = np.flatnonzero(feasible & (bounds < best['ss'] - 1e-9))
+        for idx in candidates[np.argsort(bounds[candidates], kind='stable')].tolist():
+            if bounds[idx] >= best['ss'] - 1e-9 or timed_out:
+                break
+            team, s = teams[idx], skills[idx]
+            chosen.append(team)
+            if teams_left == 0:
+                # bounds of complete leagues are exact
+                best['ss'], best['genome'] = bounds[idx], np.array(chosen)
+            else:
+                available[team] = False
+                search(t + 1, int(team.min()), sum_a + s, sumsq_a + s * s, skill_left - s,
+                       salary_left - salaries[idx])
+                available[team] = True
+            chosen.pop()
+
+    search(0, -1, 0.0, 0.0, table.skill[available].sum(), table.salary[available].sum())
+
+    elapsed = time.perf_counter() - start
+    individual = None
+    fitness = float('inf')
+    if best['genome'] is not None:
+        individual = LeagueIndividual(table, team_structure, budget_limit, num_teams,
+                                      genome=best['genome'].astype(np.int32))
+        fitness = individual.fitness
+
+    info = {'fitness': float(fitness), 'optimal': not timed_out, 'nodes': nodes, 'time_sec': round(elapsed, 3)}
+    if verbose:
+        status = "Optimal" if info['optimal'] else "Best found (time limit reached)"
+        print(f"{status} fitness: {fitness:.6f} | {nodes} nodes | {elapsed:.2f}s")
+
+    return individual, info
@@ -0,0 +1,222 @@
+# island.py
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from algorithms.algorithm import (generate_initial_population, population_to_arrays, population_from_arrays,
+                                  _next_generation)
+from utils.Classes import PlayerTable
+from utils.fitness import FitnessCache, evaluate_pending
+from utils.metrics import GAHistory
+
+# ISLAND WORKERS
+# state of each worker process, set once by _init_island_worker so the player data is not sent with every epoch
+_island_state = {}
+
+def _init_island_worker(players_by_position, team_structure, budget_limit, num_teams):
+    _island_state['problem'] = (PlayerTable.from_players_by_position(players_by_position),
+                                team_structure, budget_limit, num_teams)
+    _island_state['cache'] = FitnessCache()
+
+
+def _evolve_island(genomes, fitnesses, operators, generations, elitism, seed):
+
+    """
+    Evolves one island for a number of generations, with the generational step of
+    genetic_algorithm (see algorithm._next_generation), and returns its population as arrays (see population_to_arrays)
+    and the fitnesses of the population after each generation, of shape (generations, island_size).
+    """
+
+    # every epoch of every island has its own seed, so the result does not depend on the scheduling
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+    cache = _island_state['cache']
+    population = population_from_arrays(genomes, fitnesses, *_island_state['problem'])
+    population_size = len(population)
+    curve = np.empty((generations, population_size))
+
+    fitnesses = evaluate_pending(population, cache)
+    for g in range(generations):
+        population, fitnesses, _ = _next_generation(population, fitnesses, population_size, operators, cache,
+                                                    elitism)
+        curve[g] = fitnesses
+
+    return (*population_to_arrays(population), curve)
+
+
+# MIGRATION
+def migrate(islands, migrants=1, topology='ring'):
+
+    """
+    Sends copies of the best individuals of each island to its neighbours, where they
+    replace the worst individuals. Islands are given as (genomes, fitnesses) arrays.
+
+    Args:
+        islands (list[tuple]): The (genomes, fitnesses) of each island.
+        migrants (int): Number of individuals sent by each island to each neighbour.
+        topology (str): 'ring' (island i sends to island i+1) or 'fully_connected' (every island sends to all others).
+
+    Returns:
+        list[tuple]: The (genomes, fitnesses) of each island after the migration.
+
+    Raises:
+        ValueError: If the topology is not recognized.
+    """
+
+    num_islands = len(islands)
+    if topology == 'ring':
+        neighbours = [[(i + 1) % num_islands] for i in range(num_islands)]
+    elif topology == 'fully_connected':
+        neighbours = [[j for j in range(num_islands) if j != i] for i in range(num_islands)]
+    else:
+        raise ValueError(f"Unknown topology: {topology}")
+
+    # migrants are chosen before any island is changed
+    outgoing = []
+    for genomes, fitnesses in islands:
+        best = np.argsort(fitnesses, kind='stable')[:migrants]
+        outgoing.append((genomes[best], fitnesses[best]))
+
+    incoming = [[] for _ in range(num_islands)]
+    for i in range(num_islands):
+        if num_islands > 1:
+            for j in neighbours[i]:
+                incoming[j].append(outgoing[i])
+
+    new_islands = []
+    for (genomes, fitnesses), arrivals in zip(islands, incoming):
+        genomes, fitnesses = genomes.copy(), fitnesses.copy()
+        if arrivals:
+            arrival_genomes = np.concatenate([g for g, _ in arrivals])
+            arrival_fitnesses = np.concatenate([f for _, f in arrivals])
+            # replace the worst individuals, never more than half of the island
+            count = min(len(arrival_genomes), len(genomes) // 2)
+            worst = np.argsort(fitnesses, kind='stable')[::-1][:count]
+            genomes[worst] = arrival_genomes[:count]
+            fitnesses[worst] = arrival_fitnesses[:count]
+        new_islands.append((genomes, fitnesses))
+
+    return new_islands
+
+
+# ISLAND GENETIC ALGORITHM
+def island_genetic_algorithm(
+    players_by_position,
+    team_structure,
+    budget_limit,
+    num_teams,
+    island_size,
+    generations,
+    operator_combos,
+    migration_interval=10,
+    migrants=1,
+    topology='ring',
+    mutation_rate=0.2,
+    xo_prob=0.9,
+    elitism=True,
+    k_tournament=3,
+    workers=None,
+    verbose=True,
+    history=None
+):
+
+    """
+    Executes an island-model genetic algorithm: one sub-population (island) per operator combo,
+    each evolved in its own process with the generational loop of genetic_algorithm.
+    Every migration_interval generations the best individuals of each island migrate to its
+    neighbours (see migrate). Only arrays of player ids travel between processes.
+
+    Args:
+        players_by_position (dict or PlayerTable): A dictionary where keys are positions and values are lists of Player objects,
+            or the PlayerTable shared by every individual.
+        team_structure (dict): A dictionary defining the structure of each team.
+        budget_limit (float): The budget limit for the league.
+        num_teams (int): The number of teams in the league.
+        island_size (int): Number of individuals of each island.
+        generations (int): The number of generations to evolve.
+        operator_combos (list[tuple]): One (selection_fn, crossover_fn, mutation_fn) per island, for example
+            taken from the selection/crossover/mutation methods listed in utils/combinations.py.
+            The functions must be module-level functions.
+        migration_interval (int, optional): Number of generations between migrations. Defaults to 10.
+        migrants (int, optional): Number of individuals sent by each island to each neighbour. Defaults to 1.
+        topology (str, optional): 'ring' or 'fully_connected'. Defaults to 'ring'.
+        mutation_rate (float, optional): Probability of applying mutation. Defaults to 0.2.
+        xo_prob (float, optional): Probability of applying crossover. Defaults to 0.9.
+        elitism (bool, optional): If True, each island carries its best individual to the next generation. Defaults to True.
+        k_tournament (int, optional): Tournament size, used by islands with tournament selection. Defaults to 3.
+        workers (int, optional): Number of processes. Defaults to one per island; 1 runs every island in this process.
+        verbose (bool, optional): If True, prints the best fitness of each island after each migration. Defaults to True.
+        history (GAHistory, optional): History where the best, mean and std of the fitness of all islands together
+            and the number of fitness evaluations are recorded after each generation. Defaults to a new GAHistory.
+
+    Returns:
+        GASolution: The best individual found on any island, with its history attribute set to the GAHistory
+        of the run.
+    """
+
+    table = PlayerTable.from_players_by_position(players_by_position)
+    problem = (table, team_structure, budget_limit, num_teams)
+    num_islands = len(operator_combos)
+    if workers is None:
+        workers = num_islands
+
+    operators = [dict(selection_fn=sel, crossover_fn=xo, mutation_fn=mut, mutation_rate=mutation_rate,
+                      xo_prob=xo_prob, k_tournament=k_tournament) for sel, xo, mut in operator_combos]
+
+    if history is None:
+        history = GAHistory(capacity=generations or 64)
+
+    # Generate the initial population of each island
+    islands = []
+    for _ in range(num_islands):
+        population = generate_initial_population(island_size, table, team_structure, budget_limit, num_teams)
+        evaluate_pending(population)
+        islands.append(population_to_arrays(population))
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_island_worker, initargs=problem)
+    else:
+        _init_island_worker(*problem)
+
+    try:
+        done = 0
+        while done < generations:
+            epoch = min(migration_interval, generations - done)
+            seeds = [random.getrandbits(64) for _ in range(num_islands)]
+            args = ([genomes for genomes, _ in islands], [fitnesses for _, fitnesses in islands],
+                    operators, [epoch] * num_islands, [elitism] * num_islands, seeds)
+
+            if executor is None:
+                results = list(map(_evolve_island, *args))
+            else:
+                results = list(executor.map(_evolve_island, *args))
+            islands = [(genomes, fitnesses) for genomes, fitnesses, _ in results]
+
+            # one row per generation of the epoch, over the individuals of every island
+            curves = np.hstack([curve for _, _, curve in results])
+            for g, fitnesses in enumerate(curves, start=1):
+                finite = fitnesses[np.isfinite(fitnesses)]
+                history.append(best=fitnesses.min(), mean=finite.mean() if len(finite) else np.inf,
+                               std=finite.std() if len(finite) else np.nan,
+                               evaluations=(done + g + 1) * curves.shape[1])
+            done += epoch
+
+            if done < generations:
+                islands = migrate(islands, migrants=migrants, topology=topology)
+
+            if verbose:
+                bests = " | ".join(f"{fitnesses.min():.4f}" for _, fitnesses in islands)
+                print(f"Generation {done:03d} | Best per island: {bests}")
+
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # best individual over all islands
+    genomes = np.concatenate([genomes for genomes, _ in islands])
+    fitnesses = np.concatenate([fitnesses for _, fitnesses in islands])
+    best = int(np.argmin(fitnesses))
+    best_solution = population_from_arrays(genomes[best:best + 1], fitnesses[best:best + 1], *problem)[0]
+    best_solution.history = history
+    return best_solution
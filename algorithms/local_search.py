@@ -0,0 +1,76 @@
+# local_search.py
+import time
+import numpy as np
+
+# POSITION BLOCKS
+def position_slots(individual):
+    # columns of the genome holding each position, one (num_teams, count) array per position;
+    # same-position swaps keep every player's column, so the blocks stay valid while climbing
+    codes = individual.table.position_code[individual.genome]
+    order = np.argsort(codes, axis=1, kind='stable')
+    bounds = np.flatnonzero(np.diff(np.take_along_axis(codes[:1], order[:1], axis=1)[0])) + 1
+    return np.split(order, bounds, axis=1)
+
+
+def swaps_per_step(individual):
+    # number of swaps scored by one step of hill_climb
+    return sum(slots.size ** 2 for slots in position_slots(individual))
+
+
+# HILL CLIMBING
+def hill_climb(individual, max_evaluations=10000, max_ms=None):
+
+    """
+    Improves a league with a bounded best-improvement hill climb over same-position swaps.
+    Each step scores every swap between two players of the same position at once with the
+    incremental fitness (see LeagueIndividual.swap_deltas, one block per position) and applies
+    the best one, until no swap improves the fitness or the budget is spent. The individual
+    given is not modified.
+
+    Args:
+        individual (LeagueIndividual): The league to improve.
+        max_evaluations (int, optional): Maximum number of swaps scored (each step scores
+            num_teams ** 2 * sum(count ** 2) swaps, count being the players of each position
+            in a team; see swaps_per_step). Defaults to 10000.
+        max_ms (float, optional): Time budget in milliseconds. Defaults to None (no time limit).
+
+    Returns:
+        tuple: The improved copy of the individual (the individual itself if no swap was applied)
+        and the number of swaps scored.
+
+    Raises:
+        ValueError: If max_evaluations is smaller than one step.
+    """
+
+    blocks = position_slots(individual)
+    step_cost = sum(slots.size ** 2 for slots in blocks)
+    if step_cost > max_evaluations:
+        raise ValueError(f"hill_climb: max_evaluations={max_evaluations} is smaller than one step "
+                         f"({step_cost} swaps scored).")
+
+    deadline = None if max_ms is None else time.perf_counter() + max_ms / 1000
+    improved = individual
+    evaluations = 0
+
+    while deadline is None or time.perf_counter() < deadline:
+        if evaluations + step_cost > max_evaluations:
+            break
+
+        # best swap of each position block
+        best_delta, best_swap = np.inf, None
+        for slots in blocks:
+            deltas = improved.swap_deltas(slots=slots)
+            i, a, j, b = np.unravel_index(np.argmin(deltas), deltas.shape)
+            if deltas[i, a, j, b] < best_delta:
+                best_delta, best_swap = deltas[i, a, j, b], (i, slots[i, a], j, slots[j, b])
+        evaluations += step_cost
+        if not best_delta < -1e-12:
+            break
+
+        if improved is individual:
+            improved = individual.copy() # copied once, the swaps are applied in place
+        i, a, j, b = best_swap
+        genome = improved.genome
+        improved.apply_swap(i, j, genome[i, a], genome[j, b])
+
+    return improved, evaluations
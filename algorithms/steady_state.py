@@ -0,0 +1,333 @@
+# steady_state.py
+import bisect
+import heapq
+import random
+from collections import Counter
+import numpy as np
+from algorithms.algorithm import generate_initial_population, breed_offspring
+from algorithms.GA_selection import selection_rng, distinct_rows
+from utils.Classes import PlayerTable
+from utils.fitness import FitnessCache, evaluate_pending, league_signatures
+from utils.metrics import GAHistory
+from utils.stopping import StoppingCriteria
+
+# POPULATION HEAP
+class _PopulationHeap:
+    def __init__(self, fitnesses):
+        """
+        Keeps the best and the worst slot of a fixed-size population in two heaps, so both are
+        found in O(1) and a slot is replaced in O(log n). Replaced entries are left in the heaps
+        and skipped lazily (each slot has a version, bumped on every replacement).
+        The mean and the sum of squared deviations of the fitness are updated on every replacement
+        (Welford-style, so the std of a converged population does not suffer from cancellation).
+
+        Args:
+            fitnesses (list[float]): The fitness of each slot. The list is updated in place by replace.
+        """
+        self.fitnesses = fitnesses
+        self.versions = [0] * len(fitnesses)
+        self._rebuild()
+
+    def _rebuild(self):
+        # running mean and sum of squared deviations for mean_std, recomputed here so rounding errors do not build up
+        self.mean = float(np.mean(self.fitnesses))
+        self.m2 = float(np.sum(np.square(np.asarray(self.fitnesses) - self.mean)))
+        self.best_heap = [(fit, 0, i) for i, fit in enumerate(self.fitnesses)]
+        self.worst_heap = [(-fit, 0, i) for i, fit in enumerate(self.fitnesses)]
+        self.versions = [0] * len(self.fitnesses)
+        heapq.heapify(self.best_heap)
+        heapq.heapify(self.worst_heap)
+
+    def _top(self, heap):
+        while heap[0][1] != self.versions[heap[0][2]]:
+            heapq.heappop(heap)
+        return heap[0][2]
+
+    def best(self):
+        return self._top(self.best_heap)
+
+    def worst(self):
+        return self._top(self.worst_heap)
+
+    # mean and std of the population fitness, in O(1)
+    def mean_std(self):
+        return self.mean, np.sqrt(max(self.m2, 0.0) / len(self.fitnesses))
+
+    def replace(self, i, fitness):
+        # one value of the population changes: the mean moves by delta / n
+        old = self.fitnesses[i]
+        old_mean = self.mean
+        self.mean += (fitness - old) / len(self.fitnesses)
+        self.m2 += (fitness - old) * (fitness - self.mean + old - old_mean)
+        self.fitnesses[i] = fitness
+        self.versions[i] += 1
+        heapq.heappush(self.best_heap, (fitness, self.versions[i], i))
+        heapq.heappush(self.worst_heap, (-fitness, self.versions[i], i))
+        # drop the stale entries once they outnumber the live ones
+        if len(self.best_heap) > 4 * len(self.fitnesses):
+            self._rebuild()
+
+
+# INCREMENTAL SELECTION
+class _IncrementalSelection:
+    def __init__(self, method, fitnesses, k=None):
+        """
+        Selection structure of a steady-state population, updated in O(log n) when a slot is replaced
+        instead of being rebuilt from the whole population every step (see GA_selection for the methods):
+            - 'sel_tournament': k distinct slots drawn at random, O(k);
+            - 'sel_roulette' and 'sel_sus': Fenwick tree of the 1/fitness weights, drawn by descending it;
+            - 'sel_rank': slots sorted by fitness (bisect), the rank is drawn in closed form.
+
+        Args:
+            method (str): Name of the selection function.
+            fitnesses (list[float]): The fitness of each slot.
+            k (int, optional): Tournament size.
+
+        Raises:
+            ValueError: If the method has no incremental version, or k is invalid for tournament selection.
+        """
+        if method not in ('sel_tournament', 'sel_roulette', 'sel_sus', 'sel_rank'):
+            raise ValueError(f"No incremental selection for {method}.")
+        if method == 'sel_tournament' and (k is None or k > len(fitnesses)):
+            raise ValueError(f"Invalid tournament size k={k} for a population of {len(fitnesses)}.")
+        self.method = method
+        self.k = k
+        self.rng = selection_rng() # seeded from `random`, so runs are reproducible with random.seed
+        self.fitness = np.array(fitnesses, dtype=np.float64)
+        self.updates = 0
+        self._rebuild()
+
+    def _rebuild(self):
+        n = len(self.fitness)
+        if self.method == 'sel_rank':
+            self.order = sorted(zip(self.fitness.tolist(), range(n)))
+        elif self.method in ('sel_roulette', 'sel_sus'):
+            # weights as in _inverse_fitness_weights: fitness 0 takes all the mass, invalid (inf) none
+            self.zeros = set(np.flatnonzero(self.fitness <= 0).tolist())
+            self.tree = [0.0] + [self._weight(f) for f in self.fitness.tolist()]
+            for i in range(1, n + 1):
+                parent = i + (i & -i)
+                if parent <= n:
+                    self.tree[parent] += self.tree[i]
+            self.step = 1 << (n.bit_length() - 1)
+
+    @staticmethod
+    def _weight(fitness):
+        return 1 / fitness if 0 < fitness < np.inf else 0.0
+
+    def _add(self, i, weight):
+        i += 1
+        while i < len(self.tree):
+            self.tree[i] += weight
+            i += i & -i
+
+    def _find(self, target):
+        # slot where the cumulative weight passes target
+        pos, step = 0, self.step
+        while step:
+            nxt = pos + step
+            if nxt < len(self.tree) and self.tree[nxt] <= target:
+                pos, target = nxt, target - self.tree[nxt]
+            step >>= 1
+        return min(pos, len(self.fitness) - 1)
+
+    # num slots drawn with the selection method, as an array of indices
+    def draw(self, num):
+        n = len(self.fitness)
+        if self.method == 'sel_tournament':
+            contestants = distinct_rows(self.rng, n, num, self.k)
+            return contestants[np.arange(num), np.argmin(self.fitness[contestants], axis=1)]
+
+        if self.method == 'sel_rank':
+            # rank r (1 for the worst, n for the best) drawn with probability proportional to r
+            u = self.rng.random(num) * n * (n + 1) / 2
+            ranks = np.minimum(np.floor((np.sqrt(8 * u + 1) - 1) / 2).astype(int) + 1, n)
+            return np.array([self.order[n - r][1] for r in ranks.tolist()])
+
+        if self.zeros:
+            zeros = sorted(self.zeros)
+            return np.array(zeros)[self.rng.integers(0, len(zeros), size=num)]
+        total = self._find_total()
+        if total <= 0:
+            return self.rng.integers(0, n, size=num)
+        if self.method == 'sel_sus':
+            pointers = (self.rng.random() + np.arange(num)) * total / num
+            self.rng.shuffle(pointers)
+        else:
+            pointers = self.rng.random(num) * total
+        return np.array([self._find(target) for target in pointers.tolist()])
+
+    def _find_total(self):
+        i, total = len(self.fitness), 0.0
+        while i:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def replace(self, i, fitness):
+        old = self.fitness[i]
+        self.fitness[i] = fitness
+        if self.method == 'sel_rank':
+            del self.order[bisect.bisect_left(self.order, (old, i))]
+            bisect.insort(self.order, (fitness, i))
+        elif self.method in ('sel_roulette', 'sel_sus'):
+            self._add(i, self._weight(fitness) - self._weight(old))
+            self.zeros.discard(i)
+            if fitness <= 0:
+                self.zeros.add(i)
+
+        # rebuilt every n updates (amortized O(1)), so rounding errors of the tree do not build up
+        self.updates += 1
+        if self.updates >= len(self.fitness):
+            self.updates = 0
+            self._rebuild()
+
+
+# STEADY-STATE GENETIC ALGORITHM
+def steady_state_genetic_algorithm(
+    players_by_position,
+    team_structure,
+    budget_limit,
+    num_teams,
+    population_size,
+    steps,
+    selection_fn,
+    crossover_fn,
+    mutation_fn,
+    mutation_rate=0.2,
+    xo_prob=0.9,
+    k_tournament=None,
+    offspring_per_step=2,
+    replacement='worst',
+    replacement_k=3,
+    verbose=True,
+    fitness_cache=None,
+    max_time=None,
+    max_evaluations=None,
+    stagnation=None,
+    target_fitness=None,
+    history=None
+):
+
+    """
+    Executes a steady-state genetic algorithm: instead of rebuilding the population every generation,
+    each step breeds one or two offspring (with the same selection, crossover and mutation functions
+    as genetic_algorithm) and inserts each of them in place of a population member, if it is not worse
+    and the same league is not already in the population (so the population does not fill with clones).
+    The best individual is never replaced. The selection structures of the selection functions of
+    GA_selection and the history statistics are updated with each replacement, so a step does not
+    go over the whole population.
+
+    Args:
+        players_by_position (dict or PlayerTable): A dictionary where keys are positions and values are lists of Player objects,
+            or the PlayerTable shared by every individual.
+        team_structure (dict): A dictionary defining the structure of each team.
+        budget_limit (float): The budget limit for the league.
+        num_teams (int): The number of teams in the league.
+        population_size (int): Number of individuals of the population.
+        steps (int): The maximum number of steps (None for no limit on steps).
+        selection_fn (Callable): Function used for selecting individuals.
+        crossover_fn (Callable): Function used for crossover between two parents.
+        mutation_fn (Callable): Function used for mutating an individual.
+        mutation_rate (float, optional): Probability of applying mutation. Defaults to 0.2.
+        xo_prob (float, optional): Probability of applying crossover. Defaults to 0.9.
+        k_tournament (int, optional): Number of individuals to select in the tournament selection. Defaults to None.
+        offspring_per_step (int, optional): 1 or 2 offspring inserted per step. Defaults to 2.
+        replacement (str, optional): 'worst' replaces the worst individual (kept in a heap, O(log n));
+            'tournament' replaces the worst of replacement_k random individuals. Defaults to 'worst'.
+        replacement_k (int, optional): Size of the replacement tournament. Defaults to 3.
+        verbose (bool, optional): If True, prints the best fitness every population_size evaluations. Defaults to True.
+        fitness_cache (FitnessCache, optional): Cache of fitness values. Defaults to a new cache for this run.
+        max_time (float, optional): Time budget of the run in seconds. Defaults to None.
+        max_evaluations (int, optional): Maximum number of fitness evaluations. Defaults to None.
+        stagnation (int, optional): Stop after this many steps without improvement of the best fitness. Defaults to None.
+        target_fitness (float, optional): Stop as soon as the best fitness reaches this value. Defaults to None.
+        history (GAHistory, optional): History where the best, mean and std of the fitness of the population,
+            the number of evaluations, the number of replacements and the number of children rejected as
+            duplicates of a population member are recorded after each step.
+            Defaults to a new GAHistory.
+
+    Returns:
+        GASolution: The best individual found, with the stop_reason ('steps', 'max_time', 'max_evaluations',
+        'stagnation' or 'target_fitness'), elapsed and history attributes (see genetic_algorithm).
+
+    Raises:
+        ValueError: If offspring_per_step or replacement is not recognized.
+    """
+
+    if offspring_per_step not in (1, 2):
+        raise ValueError("offspring_per_step must be 1 or 2.")
+    if replacement not in ('worst', 'tournament'):
+        raise ValueError(f"Unknown replacement: {replacement}")
+
+    stopping = StoppingCriteria(steps, max_time=max_time, max_evaluations=max_evaluations,
+                                stagnation=stagnation, target_fitness=target_fitness)
+    if fitness_cache is None:
+        fitness_cache = FitnessCache()
+    if history is None:
+        history = GAHistory(capacity=steps or 64)
+
+    table = PlayerTable.from_players_by_position(players_by_position)
+    operators = dict(selection_fn=selection_fn, crossover_fn=crossover_fn, mutation_fn=mutation_fn,
+                     mutation_rate=mutation_rate, xo_prob=xo_prob, k_tournament=k_tournament)
+
+    # Generate the initial population
+    population = generate_initial_population(population_size, table, team_structure, budget_limit, num_teams)
+    fitnesses = evaluate_pending(population, fitness_cache).tolist()
+    heap = _PopulationHeap(fitnesses)
+    # selection structure updated with the population (other selection functions rebuild theirs every step)
+    selection = None
+    if selection_fn.__name__ in ('sel_tournament', 'sel_roulette', 'sel_sus', 'sel_rank'):
+        selection = _IncrementalSelection(selection_fn.__name__, fitnesses, k_tournament)
+    # number of members of each league in the population (by league_signatures), to reject duplicate children
+    signatures = league_signatures(np.stack([ind.individual.genome for ind in population]))
+    members = Counter(signatures)
+    evaluations = len(population)
+    replacements = duplicates = 0
+    step = 0
+
+    while stopping.update(step, fitnesses[heap.best()], evaluations) is None:
+        children = breed_offspring(population, fitnesses, offspring_per_step, **operators,
+                                   draw_parents=selection.draw if selection is not None else None)
+        children = children[:offspring_per_step]
+        child_fitnesses = evaluate_pending(children, fitness_cache).tolist()
+        child_signatures = league_signatures(np.stack([child.individual.genome for child in children]))
+        evaluations += len(children)
+
+        for child, child_fitness, signature in zip(children, child_fitnesses, child_signatures):
+            if members[signature]:
+                duplicates += 1 # a league already in the population would only make clones
+                continue
+            if replacement == 'worst':
+                victim = heap.worst()
+            else:
+                victim = max(random.sample(range(len(population)), min(replacement_k, len(population))),
+                             key=fitnesses.__getitem__)
+            if victim != heap.best() and child_fitness <= fitnesses[victim]:
+                population[victim] = child
+                members[signatures[victim]] -= 1
+                members[signature] += 1
+                signatures[victim] = signature
+                heap.replace(victim, child_fitness)
+                if selection is not None:
+                    selection.replace(victim, child_fitness)
+                replacements += 1
+
+        step += 1
+        mean, std = heap.mean_std()
+        history.append(best=fitnesses[heap.best()], mean=mean, std=std, evaluations=evaluations,
+                       replacements=replacements, duplicates=duplicates)
+
+        if verbose and evaluations // population_size != (evaluations - len(children)) // population_size:
+            print(f"Step {step:05d} | Evaluations: {evaluations} | Best: {fitnesses[heap.best()]:.4f}")
+
+    # the step limit is the generation limit of StoppingCriteria
+    reason = 'steps' if stopping.reason == 'generations' else stopping.reason
+    if verbose:
+        print(f"Stopped after {step} steps ({reason})")
+
+    best = population[heap.best()]
+    best.stop_reason = reason
+    best.elapsed = stopping.elapsed()
+    best.history = history
+    return best
@@ -0,0 +1,46 @@
+# instances.py
+import numpy as np
+from utils.Classes import Player
+
+# share of each position in the pool and players per team, as in data/players.csv
+TEAM_STRUCTURE = {"GK": 1, "DEF": 2, "MID": 2, "FWD": 2}
+
+def synthetic_instance(num_players, num_teams, budget_slack=0.1, seed=0):
+    """
+    Generates a synthetic player pool shaped like data/players.csv: skills around 86,
+    salaries growing with skill, and positions in the proportions of the team structure.
+
+    Args:
+        num_players (int): Number of players in the pool (raised if needed to fill every team).
+        num_teams (int): Number of teams in the league.
+        budget_slack (float): Budget tightness, as the budget of a team above the salary of an
+            average team (0.1 is 10% above; 0 is very tight). Defaults to 0.1.
+        seed (int): Seed of the generator. Defaults to 0.
+
+    Returns:
+        tuple: (players_by_position, team_structure, budget_limit, num_teams).
+    """
+
+    rng = np.random.default_rng(seed)
+    team_size = sum(TEAM_STRUCTURE.values())
+
+    players_by_position = {}
+    salaries = []
+    for pos, count in TEAM_STRUCTURE.items():
+        size = max(count * num_teams, round(num_players * count / team_size))
+        skill = np.clip(np.round(rng.normal(86, 4, size)), 70, 99)
+        salary = np.round(np.maximum(40, 95 + 5 * (skill - 86) + rng.normal(0, 5, size)))
+        players_by_position[pos] = [Player(f"{pos}{i}", pos, float(s), float(c))
+                                    for i, (s, c) in enumerate(zip(skill, salary))]
+        salaries.append(salary.mean() * count)
+
+    budget_limit = float(round(sum(salaries) * (1 + budget_slack)))
+    return players_by_position, dict(TEAM_STRUCTURE), budget_limit, num_teams
+
+
+# benchmark instances: name -> (num_players, num_teams, population size of the selection benchmarks)
+SCALES = {
+    'small': (35, 5, 100),
+    'medium': (1000, 50, 1000),
+    'large': (10000, 200, 10000),
+}
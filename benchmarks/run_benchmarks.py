@@ -0,0 +1,248 @@
+# run_benchmarks.py
+"""
+Micro-benchmarks of the GA operators on synthetic instances (see benchmarks/instances.py).
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --scales small medium --baseline benchmarks/baseline.json
+
+Results are written as JSON (median and minimum milliseconds per call over rounds of identical,
+seeded calls, and their spread). With --baseline, the minimum time of each benchmark is compared
+with the stored results. A benchmark is flagged when it is slower by more than --tolerance plus
+its measured spread and by more than --min-diff-ms; flagged benchmarks are timed again for longer,
+and the run exits with status 1 only if they are still slower.
+benchmarks/baseline.json holds the results of the reference machine; regenerate it with --output
+when the reference changes.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import numpy as np
+
+from algorithms.algorithm import generate_initial_population
+from algorithms.GA_selection import sel_roulette, sel_rank, sel_tournament, sel_sus
+from algorithms.GA_crossover import team_crossover, position_crossover
+from algorithms.GA_mutation import mutation_swap_players, mutation_regenerate_team, mutation_balance_teams
+from benchmarks.instances import synthetic_instance, SCALES
+from utils.Classes import PlayerTable
+from utils.fitness import evaluate_population
+from utils.metrics import take_operator_attempts
+
+# TIMING
+def time_calls(fn, repeat, min_time=0.5, seed=0, round_time=0.02):
+    """
+    Times fn() in rounds. Each round seeds the random generators and makes the same number of calls,
+    so every round does exactly the same work, and the time per call of a round is its mean
+    (single sub-millisecond calls are too noisy to compare). The number of calls per round is set
+    after a warm-up so a round lasts about round_time seconds. At least repeat rounds are made,
+    and more until min_time seconds have passed.
+
+    Returns:
+        dict: Median and minimum milliseconds per call over the rounds, their relative spread
+        ((median - min) / min) and the number of calls.
+    """
+    def run_round(calls):
+        random.seed(seed)
+        np.random.seed(seed)
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        return time.perf_counter() - start
+
+    run_round(1) # warm-up (caches, lazy structures)
+    per_round = max(1, min(1000, int(round_time / max(run_round(1), 1e-9))))
+
+    rounds = []
+    start_all = time.perf_counter()
+    while len(rounds) < repeat or (time.perf_counter() - start_all < min_time and len(rounds) < 100 * repeat):
+        rounds.append(run_round(per_round) * 1000 / per_round)
+
+    median, fastest = statistics.median(rounds), min(rounds)
+    return {'median_ms': median, 'min_ms': fastest, 'spread': (median - fastest) / fastest if fastest > 0 else 0.0,
+            'calls': per_round * len(rounds)}
+
+
+# failed operator calls (ValueError) are part of the cost being measured
+def _tolerant(fn, *args):
+    def call():
+        try:
+            fn(*args)
+        except ValueError:
+            pass
+    return call
+
+
+# BENCHMARKS
+def benchmark_scale(name, num_players, num_teams, budget_slack, population_size, selection_size, repeat, seed,
+                    min_time=0.5, only=None):
+    # only: names of the benchmarks to time (used to re-run the flagged ones), defaults to all
+    players_by_position, team_structure, budget_limit, num_teams = synthetic_instance(
+        num_players, num_teams, budget_slack, seed)
+    table = PlayerTable.from_players_by_position(players_by_position)
+    results = {}
+
+    def timed(bench, fn):
+        if only is None or bench in only:
+            results[bench] = time_calls(fn, repeat, min_time=min_time, seed=seed)
+        return results.get(bench)
+
+    timed('generate_initial_population',
+          lambda: generate_initial_population(1, table, team_structure, budget_limit, num_teams))
+
+    random.seed(seed) # same population, so the same operator inputs, on every run
+    np.random.seed(seed)
+    population = generate_initial_population(population_size, table, team_structure, budget_limit, num_teams)
+    if len(population) < 2:
+        print(f"{name}: could not build a population, skipping the operators", file=sys.stderr)
+        return results
+    individuals = [ind.individual for ind in population]
+    fitness = [ind.fitness() for ind in population]
+    genomes = np.stack([ind.genome for ind in individuals])
+
+    # fitness
+    timed('evaluate_fitness', individuals[0].evaluate_fitness)
+    timed('evaluate_population', lambda: evaluate_population(genomes, table, team_structure, budget_limit))
+
+    # selection: the parents of a whole generation of selection_size individuals (selection only looks at
+    # the fitness values, so the population is the one built above repeated, with fitnesses drawn from it)
+    selection_population = [population[i % len(population)] for i in range(selection_size)]
+    selection_fitness = np.random.default_rng(seed).choice(fitness, selection_size).tolist()
+    selectors = {
+        'sel_roulette': lambda: sel_roulette(selection_population, selection_fitness, num=selection_size),
+        'sel_rank': lambda: sel_rank(selection_population, selection_fitness, num=selection_size),
+        'sel_tournament': lambda: sel_tournament(selection_population, selection_fitness, k=3, num=selection_size),
+        'sel_sus': lambda: sel_sus(selection_population, selection_fitness, num=selection_size),
+    }
+    for bench, fn in selectors.items():
+        if timed(bench, fn):
+            results[bench]['population'] = selection_size
+
+    # crossover and mutation, with the share of calls that failed
+    operators = [(fn, (individuals[0], individuals[1])) for fn in (team_crossover, position_crossover)] + \
+        [(fn, (individuals[0],)) for fn in (mutation_swap_players, mutation_regenerate_team, mutation_balance_teams)]
+    for fn, args in operators:
+        take_operator_attempts()
+        timing = timed(fn.__name__, _tolerant(fn, *args))
+        counts = take_operator_attempts().get(fn.__name__)
+        if timing and counts:
+            timing['failure_rate'] = counts['failures'] / counts['calls']
+
+    return results
+
+
+def run(scales, budget_slack, population_size, repeat, seed, selection_size=None, min_time=0.5, only=None):
+    # only: "scale/benchmark" keys to time, defaults to every benchmark of the scales
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'budget_slack': budget_slack,
+            'population_size': population_size,
+            'selection_size': selection_size,
+            'seed': seed,
+            'min_time': min_time,
+        },
+        'results': {},
+    }
+    for name in scales:
+        benches = None if only is None else {key.split('/', 1)[1] for key in only if key.split('/', 1)[0] == name}
+        if benches is not None and not benches:
+            continue
+        num_players, num_teams, scale_selection_size = SCALES[name]
+        print(f"Benchmarking {name}: {num_players} players, {num_teams} teams", file=sys.stderr)
+        for bench, timing in benchmark_scale(name, num_players, num_teams, budget_slack, population_size,
+                                             selection_size or scale_selection_size, repeat, seed,
+                                             min_time=min_time, only=benches).items():
+            report['results'][f"{name}/{bench}"] = timing
+    return report
+
+
+# BASELINE COMPARISON
+def compare(report, baseline, tolerance, min_diff_ms=0.05, verbose=True):
+    """
+    Compares each benchmark with the baseline, on the minimum time per call over the rounds
+    (less sensitive to noise from other processes than the median). A benchmark is flagged when it is
+    slower than the baseline by more than tolerance plus the spread measured for it (in the baseline or
+    in this run, whichever is larger), and by more than min_diff_ms milliseconds per call.
+
+    Returns:
+        list[str]: The flagged benchmarks.
+    """
+    regressions = []
+    for key, timing in report['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            if verbose:
+                print(f"{key:45s} {timing['min_ms']:10.3f} ms   (no baseline)")
+            continue
+        ratio = timing['min_ms'] / base['min_ms'] if base['min_ms'] > 0 else float('inf')
+        allowed = 1 + tolerance + max(base.get('spread', 0.0), timing.get('spread', 0.0))
+        slower = ratio > allowed and timing['min_ms'] - base['min_ms'] > min_diff_ms
+        flag = "REGRESSION" if slower else ""
+        if verbose:
+            print(f"{key:45s} {timing['min_ms']:10.3f} ms   baseline {base['min_ms']:10.3f} ms   "
+                  f"x{ratio:5.2f} (allowed x{allowed:4.2f}) {flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the GA operators.")
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=list(SCALES))
+    parser.add_argument('--budget-slack', type=float, default=0.1,
+                        help="team budget above the salary of an average team (0 is very tight)")
+    parser.add_argument('--population', type=int, default=20,
+                        help="individuals built for the fitness, crossover and mutation benchmarks")
+    parser.add_argument('--selection-size', type=int,
+                        help="population of the selection benchmarks (defaults to the size of each scale)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="path of the JSON results")
+    parser.add_argument('--baseline', help="JSON results to compare with")
+    parser.add_argument('--min-time', type=float, default=0.5, help="minimum seconds timed per benchmark")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="slowdown over the baseline (on top of its measured spread) flagged as a "
+                             "regression (0.25 is 25%%)")
+    parser.add_argument('--min-diff-ms', type=float, default=0.05,
+                        help="slowdowns smaller than this many milliseconds per call are never flagged")
+    args = parser.parse_args(argv)
+
+    report = run(args.scales, args.budget_slack, args.population, args.repeat, args.seed, args.selection_size,
+                 args.min_time)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.min_diff_ms)
+        if regressions:
+            # a slowdown must show again, with three times longer timings, before it fails the run
+            print(f"Re-running {len(regressions)} flagged benchmark(s)", file=sys.stderr)
+            rerun = run(args.scales, args.budget_slack, args.population, 3 * args.repeat, args.seed,
+                        args.selection_size, 3 * args.min_time, only=regressions)
+            for key, timing in rerun['results'].items():
+                if timing['min_ms'] < report['results'][key]['min_ms']:
+                    report['results'][key] = timing
+            rerun['results'] = {key: report['results'][key] for key in regressions}
+            regressions = compare(rerun, baseline, args.tolerance, args.min_diff_ms)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+    else:
+        regressions = []
+        for key, timing in report['results'].items():
+            failures = f"   failure rate {timing['failure_rate']:.0%}" if 'failure_rate' in timing else ""
+            print(f"{key:45s} {timing['median_ms']:10.3f} ms{failures}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,15 @@
 # imports
+import csv
+import hashlib
+from collections import OrderedDict
 import random
-from copy import deepcopy
 import numpy as np
+from utils.fitness import evaluate_population
 
 # ====== PLAYER CLASS ======
 class Player:
+    __slots__ = ('name', 'position', 'skill', 'salary')
+
     def __init__(self, name, position, skill, salary):
 
         """
@@ -51,11 +56,17 @@ class Player:
 
 # ====== TEAM CLASS ======
 class Team:
+    __slots__ = ('players', '_total_salary', '_avg_skill', '_position_counts', '_names', '_hash', '_validity')
+
     def __init__(self, players):
 
         """
 
         Represents a team composed of players.
+        Teams are immutable value objects: the total salary, the average skill, the number
+        of players per position and the hash are computed once here, and the result of
+        is_valid is cached for each structure/budget, so the same Team can be shared
+        by several leagues without being validated again.
         Args:
             players (list[Player]): List of Player objects in the team.
 
@@ -67,48 +78,240 @@ class Team:
             ValueError: If the budget limit is not a positive number.
 
         """
-        self.players = players  # List of Player objects
+        players = tuple(players)  # Tuple of Player objects
+        position_counts = {}
+        for p in players:
+            position_counts[p.position] = position_counts.get(p.position, 0) + 1
+        names = frozenset(p.name for p in players)
+
+        set_attr = object.__setattr__
+        set_attr(self, 'players', players)
+        set_attr(self, '_total_salary', sum(p.salary for p in players))
+        set_attr(self, '_avg_skill', sum(p.skill for p in players) / len(players) if players else float('nan'))
+        set_attr(self, '_position_counts', position_counts)
+        set_attr(self, '_names', names)
+        set_attr(self, '_hash', hash(names))
+        set_attr(self, '_validity', {})  # (structure, budget) -> result of is_valid
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Team is immutable, build a new Team instead.")
 
     # method to check if the team is valid
     def is_valid(self, structure, budget):
-        if len(self.players) != sum(structure.values()):
-            return False
-
-        # Check if the team has the correct number of players in each position
-        # and if the total salary is within the budget
-        pos_counts = {pos: 0 for pos in structure}
-        total_salary = 0
-        names_seen = set()
+        key = (tuple(structure.items()), budget)
+        valid = self._validity.get(key)
 
-        # add players to the team
-        for player in self.players:
-            if player.name in names_seen:
-                return False
-            names_seen.add(player.name)
-            pos_counts[player.position] += 1
-            total_salary += player.salary
+        if valid is None:
+            # Check that there are no duplicated players, that the team has the correct number
+            # of players in each position and that the total salary is within the budget
+            valid = len(self.players) == sum(structure.values()) and \
+                len(self._names) == len(self.players) and \
+                self._position_counts == {pos: count for pos, count in structure.items() if count} and \
+                self._total_salary <= budget
+            self._validity[key] = valid
 
-        return pos_counts == structure and total_salary <= budget
+        return valid
 
     # get the average skill of the team
     def avg_skill(self):
-        return sum(p.skill for p in self.players) / len(self.players)
+        return self._avg_skill
 
     # get the total salary of the team
     def total_salary(self):
-        return sum(p.salary for p in self.players)
+        return self._total_salary
+
+    # get the number of players in each position
+    def position_counts(self):
+        return dict(self._position_counts)
 
     # get the players of the team
     def player_names(self):
         return [p.name for p in self.players]
 
+    # two teams are equal if they have the same players, in any order
+    def __eq__(self, other):
+        if not isinstance(other, Team):
+            return NotImplemented
+        return self._hash == other._hash and self._names == other._names
+
+    def __hash__(self):
+        return self._hash
+
     def __repr__(self):
         return "\n".join([f"  - {p}" for p in self.players])
     
 
+# ====== PLAYER TABLE CLASS ======
+class PlayerTable:
+    def __init__(self, players, positions=None):
+
+        """
+        Columnar registry of the player pool, built once and shared by every LeagueIndividual.
+        Players are indexed by an integer id and grouped by position, so each position
+        occupies a contiguous range of ids. Leagues store player ids (see LeagueIndividual.genome)
+        and gather skills and salaries from the arrays of the table.
+
+        Args:
+            players (list[Player]): Players of the pool.
+            positions (list[str], optional): Order of the positions. Defaults to the order in which they appear.
+
+        Returns:
+            PlayerTable: An instance of the PlayerTable class.
+
+        Raises:
+            ValueError: If two players share the same name.
+            ValueError: If a player has a position that is not in positions.
+        """
+
+        if positions is None:
+            positions = list(dict.fromkeys(p.position for p in players))
+        self.positions = tuple(positions)
+        code_by_position = {pos: code for code, pos in enumerate(self.positions)}
+
+        for p in players:
+            if p.position not in code_by_position:
+                raise ValueError(f"Unknown position {p.position!r} for player {p.name!r}.")
+
+        # players are sorted by position so each position is a contiguous range of ids
+        self.players = sorted(players, key=lambda p: code_by_position[p.position])
+        self.names = [p.name for p in self.players]
+        self.id_by_name = {name: i for i, name in enumerate(self.names)}
+
+        if len(self.id_by_name) != len(self.players):
+            raise ValueError("Player names must be unique to build a PlayerTable.")
+
+        self.skill = np.array([p.skill for p in self.players], dtype=np.float64)
+        self.salary = np.array([p.salary for p in self.players], dtype=np.float64)
+        self.position_code = np.array([code_by_position[p.position] for p in self.players], dtype=np.int8)
+
+        self.position_ranges = {}
+        self.players_by_position = {}
+        start = 0
+        for pos in self.positions:
+            stop = start + int(np.count_nonzero(self.position_code == code_by_position[pos]))
+            self.position_ranges[pos] = (start, stop)
+            self.players_by_position[pos] = self.players[start:stop]
+            start = stop
+
+        # content fingerprint, so caches keyed on the table never confuse two pools (ids can be reused)
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (self.skill, self.salary, self.position_code):
+            digest.update(array.tobytes())
+        digest.update(repr(self.positions).encode())
+        self.fingerprint = digest.hexdigest()
+
+        self._teams = {}
+
+    # maximum number of Team views kept by team()
+    max_cached_teams = 10000
+
+    # last tables built from a players_by_position dict, keyed by the id of the dict
+    # (the dict itself is kept in the value so its id cannot be reused while it is cached)
+    max_cached_tables = 8
+    _cache = OrderedDict()
+
+    # table of a players_by_position dict, built once and reused while the dict holds the same players;
+    # a dict changed in place (players added, removed or replaced) gets a new table.
+    # Changing the attributes of a Player in place is not detected: build a new table (or Player) instead
+    @classmethod
+    def from_players_by_position(cls, players_by_position):
+        if isinstance(players_by_position, cls):
+            return players_by_position
+
+        key = id(players_by_position)
+        snapshot = tuple((pos, tuple(map(id, players))) for pos, players in players_by_position.items())
+        cached = cls._cache.get(key)
+        if cached is not None and cached[0] is players_by_position and cached[1] == snapshot:
+            cls._cache.move_to_end(key)
+            return cached[2]
+
+        table = cls([p for players in players_by_position.values() for p in players],
+                    positions=list(players_by_position))
+        table.players_by_position = players_by_position
+        cls._cache[key] = (players_by_position, snapshot, table)
+        cls._cache.move_to_end(key)
+        if len(cls._cache) > cls.max_cached_tables:
+            cls._cache.popitem(last=False)  # drop the least recently used table
+        return table
+
+    @classmethod
+    def from_csv(cls, path="data/players.csv", positions=None):
+        with open(path, newline='', encoding='utf-8') as f:
+            players = [Player.from_dict({key: _to_number(value) for key, value in row.items()})
+                       for row in csv.DictReader(f)]
+        return cls(players, positions=positions)
+
+    # number of players required for each position code
+    def structure_counts(self, team_structure):
+        return np.array([team_structure.get(pos, 0) for pos in self.positions])
+
+    # number of players of each position in the last axis of an array of ids
+    def position_counts(self, ids):
+        codes = self.position_code[ids]
+        return np.stack([(codes == code).sum(axis=-1) for code in range(len(self.positions))], axis=-1)
+
+    # position of a player id
+    def position_of(self, i):
+        return self.positions[self.position_code[i]]
+
+    # ids of a position not marked in a boolean mask over all player ids
+    def free_ids(self, pos, used):
+        start, stop = self.position_ranges[pos]
+        return np.flatnonzero(~used[start:stop]) + start
+
+    # check a team given as player ids (same rules as Team.is_valid)
+    def is_valid_team(self, ids, structure, budget):
+        ids = np.asarray(ids, dtype=np.intp)
+        if ids.size != sum(structure.values()) or np.unique(ids).size != ids.size:
+            return False
+        return bool((self.position_counts(ids) == self.structure_counts(structure)).all()) and \
+            self.salary[ids].sum() <= budget
+
+    # encode a list of teams as a (num_teams, players_per_team) array of player ids
+    def encode(self, league):
+        return np.array([[self.id_by_name[p.name] for p in team.players] for team in league], dtype=np.int32)
+
+    # Team view of a row of player ids, views are kept so leagues sharing a team share its Team
+    def team(self, ids):
+        key = tuple(ids.tolist()) if isinstance(ids, np.ndarray) else tuple(ids)
+        team = self._teams.get(key)
+        if team is None:
+            if len(self._teams) >= self.max_cached_teams:
+                del self._teams[next(iter(self._teams))]  # drop the oldest view
+            team = self._teams[key] = Team([self.players[i] for i in key])
+        return team
+
+    # build the Team views of an encoded league
+    def decode(self, genome):
+        return [self.team(row) for row in genome]
+
+    # the Team views are not pickled (e.g. when the table is sent to worker processes)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_teams'] = {}
+        return state
+
+    def __len__(self):
+        return len(self.players)
+
+    def __repr__(self):
+        return f"<PlayerTable players={len(self.players)} positions={self.positions}>"
+
+
+# csv values are read as strings, skills and salaries are converted back to numbers
+def _to_number(value):
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+
 # ====== LEAGUE INDIVIDUAL CLASS ======
 class LeagueIndividual:
-    def __init__(self, players_by_position, team_structure, budget_limit, num_teams, league=None):
+    def __init__(self, players_by_position, team_structure, budget_limit, num_teams, league=None, genome=None):
 
         """
         Represents an individual (= possible solution of the search space = a league of teams)
@@ -116,12 +319,18 @@ class LeagueIndividual:
         Each team is composed of players from different positions, and the total salary
         of the team must not exceed the budget limit.
 
+        The league is stored as a genome: an integer array of shape (num_teams, players_per_team)
+        with the ids of the players in a PlayerTable shared by all individuals.
+        The Team objects of `league` are views built from the genome only when accessed.
+
         Args:
-            players_by_position (dict): Dictionary where keys are positions and values are lists of Player objects.
+            players_by_position (dict or PlayerTable): Dictionary where keys are positions and values are lists of
+                Player objects, or the PlayerTable built from it.
             team_structure (dict): Dictionary defining the number of players required for each position in a team.
             budget_limit (float): Maximum budget allowed for a team.
             num_teams (int): Number of teams to create.
             league (list[Team], optional): Predefined league of teams. If None, a new league will be generated.
+            genome (np.ndarray, optional): Predefined league as an array of player ids. Takes precedence over league.
 
         Returns:
             LeagueIndividual: An instance of the LeagueIndividual class.
@@ -133,69 +342,254 @@ class LeagueIndividual:
         """
 
         
-        self.players_by_position = players_by_position
+        self.table = PlayerTable.from_players_by_position(players_by_position)
         self.team_structure = team_structure
         self.budget_limit = budget_limit
         self.num_teams = num_teams
 
-        self.league = league if league is not None else self._generate_league()
-        self.fitness = self.evaluate_fitness()
+        if genome is None and league is None:
+            genome = self._generate_league()
+
+        if genome is None:
+            self.league = league
+        else:
+            self.genome = genome
+
+    # fitness, evaluated on first access unless it was computed in batch (see utils.fitness.evaluate_pending)
+    @property
+    def fitness(self):
+        if self._fitness is None:
+            self._fitness = self.evaluate_fitness()
+        return self._fitness
+
+    @fitness.setter
+    def fitness(self, fitness):
+        self._fitness = fitness
+
+    @property
+    def players_by_position(self):
+        return self.table.players_by_position
+
+    # array of player ids, one row per team
+    @property
+    def genome(self):
+        return self._genome
+
+    @genome.setter
+    def genome(self, genome):
+        self._genome = None if genome is None else np.asarray(genome, dtype=np.int32)
+        self._shared = self._genome is genome  # the caller still holds the array, copy it before writing
+        self._league = None
+        self._stats = None
+        self._fitness = None
+
+    # Team views of the genome, built on first access
+    @property
+    def league(self):
+        if self.genome is None:
+            return None
+        if self._league is None:
+            self._league = self.table.decode(self.genome)
+        return self._league
+
+    @league.setter
+    def league(self, league):
+        self.genome = None if league is None else self.table.encode(league)
 
     def _generate_league(self):
-        league = []
-        all_players = deepcopy(self.players_by_position)
-        used_names = set()
+        genome = []
+        available = {pos: list(range(*self.table.position_ranges[pos])) for pos in self.team_structure}
 
         for _ in range(self.num_teams):
-            team_players = []
+            team_ids = []
 
             for pos, count in self.team_structure.items():
-                candidates = [p for p in all_players[pos] if p.name not in used_names]
-                if len(candidates) < count:
+                if len(available[pos]) < count:
                     return None  # Not enough players available
 
-                # Randomly select players for the position
-                selected = random.sample(candidates, count)
-                team_players.extend(selected)
-                used_names.update(p.name for p in selected)
+                # Randomly select players for the position and remove them from the pool
+                selected = random.sample(available[pos], count)
+                team_ids.extend(selected)
+                available[pos] = [i for i in available[pos] if i not in selected]
 
-            # Create team and check validity
-            team = Team(team_players)
-            if not team.is_valid(self.team_structure, self.budget_limit):
+            # Check the budget of the team
+            if self.table.salary[team_ids].sum() > self.budget_limit:
                 return None
 
-            league.append(team)
+            genome.append(team_ids)
 
-            # Remove used players from pool
-            for pos in self.players_by_position:
-                all_players[pos] = [p for p in all_players[pos] if p.name not in used_names]
-
-        return league
+        return np.array(genome, dtype=np.int32)
 
 
     # function to evaluate the fitness of the league (standard deviation of the average skills of the teams)
     def evaluate_fitness(self):
-        if self.league is None:
+        if self.genome is None:
+            return float('inf')
+
+        fitness, _, _, _ = evaluate_population(self.genome[None], self.table, self.team_structure, self.budget_limit)
+        return fitness[0]
+
+    # running per-team sums used by the incremental fitness, built on first use:
+    # (skill sum per team, salary sum per team, mean of the team averages, sum of squared deviations)
+    def _team_stats(self):
+        if self._stats is None:
+            skill_sum = self.table.skill[self.genome].sum(axis=1)
+            salary_sum = self.table.salary[self.genome].sum(axis=1)
+            avg_skills = skill_sum / self.genome.shape[1]
+            mean = avg_skills.mean()
+            self._stats = (skill_sum, salary_sum, mean, float(((avg_skills - mean) ** 2).sum()))
+        return self._stats
+
+    # squared deviations of the team averages after swapping p_out (team i) with p_in (team j)
+    # a swap keeps the mean of the team averages, so only the two affected terms change
+    def _swap_sq_dev(self, i, j, p_out, p_in):
+        skill_sum, _, mean, sq_dev = self._team_stats()
+        n = self.genome.shape[1]
+        d = (self.table.skill[p_in] - self.table.skill[p_out]) / n
+        dev_i = skill_sum[i] / n - mean
+        dev_j = skill_sum[j] / n - mean
+        return max(sq_dev + 2 * d * (dev_i - dev_j) + 2 * d * d, 0.0)
+
+    def delta_fitness(self, i, j, p_out, p_in):
+        """
+        Change in fitness if player p_out of team i is swapped with player p_in of team j.
+        Uses the running team sums, so the cost is O(1) and the individual is not modified.
+
+        Args:
+            i (int): Index of the team that loses p_out and receives p_in.
+            j (int): Index of the team that loses p_in and receives p_out.
+            p_out (int): Player id currently in team i.
+            p_in (int): Player id currently in team j.
+
+        Returns:
+            float: New fitness minus current fitness, or inf if the swap breaks
+            the team structure or the budget of one of the teams.
+        """
+        table = self.table
+        if i == j or table.position_code[p_out] != table.position_code[p_in]:
+            return float('inf')
+
+        _, salary_sum, _, sq_dev = self._team_stats()
+        salary_change = table.salary[p_in] - table.salary[p_out]
+        if salary_sum[i] + salary_change > self.budget_limit or salary_sum[j] - salary_change > self.budget_limit:
             return float('inf')
 
-        avg_skills = []
-        used_names = set()
+        num_teams = len(self.genome)
+        return np.sqrt(self._swap_sq_dev(i, j, p_out, p_in) / num_teams) - np.sqrt(sq_dev / num_teams)
 
-        for team in self.league:
-            if not team.is_valid(self.team_structure, self.budget_limit):
-                return float('inf')
+    def swap_deltas(self, rows=None, cols=None, slots=None):
+        """
+        Change in fitness of every swap between a player of a team in rows and a player of
+        a team in cols, all computed at once in closed form from the running team sums
+        (the same values as delta_fitness).
 
-            for p in team.players:
-                if p.name in used_names:
-                    return float('inf')  # Duplicated player across teams
-                used_names.add(p.name)
+        Args:
+            rows (array-like, optional): Indices of the teams that give a player. Defaults to every team.
+            cols (array-like, optional): Indices of the teams that give the other player. Defaults to every team.
+            slots (np.ndarray, optional): Columns of the genome considered in each team, of shape
+                (num_teams, k), for example the columns of one position. Defaults to every column.
 
-            avg_skills.append(team.avg_skill())
+        Returns:
+            np.ndarray: Array of shape (len(rows), k, len(cols), k), where [r, a, c, b] is the change in
+            fitness if the player in slot a of team rows[r] is swapped with the player in slot b of team
+            cols[c], or inf if the swap breaks the team structure or the budget (k is players_per_team
+            when slots is None).
+        """
+        table = self.table
+        genome = self.genome
+        num_teams, n = genome.shape
+        skill_sum, salary_sum, mean, sq_dev = self._team_stats()
+        rows = np.arange(num_teams) if rows is None else np.asarray(rows)
+        cols = np.arange(num_teams) if cols is None else np.asarray(cols)
+        team_ids = genome if slots is None else np.take_along_axis(genome, slots, axis=1)
+        out_ids = team_ids[rows][:, :, None, None]
+        in_ids = team_ids[cols][None, None, :, :]
+
+        d = (table.skill[in_ids] - table.skill[out_ids]) / n
+        dev = skill_sum / n - mean
+        new_sq_dev = sq_dev + 2 * d * (dev[rows][:, None, None, None] - dev[cols][None, None, :, None]) + 2 * d * d
+        delta = np.sqrt(np.maximum(new_sq_dev, 0.0) / num_teams) - np.sqrt(sq_dev / num_teams)
+
+        salary_change = table.salary[in_ids] - table.salary[out_ids]
+        feasible = (table.position_code[in_ids] == table.position_code[out_ids]) & \
+            (rows[:, None, None, None] != cols[None, None, :, None]) & \
+            (salary_sum[rows][:, None, None, None] + salary_change <= self.budget_limit) & \
+            (salary_sum[cols][None, None, :, None] - salary_change <= self.budget_limit)
+        return np.where(feasible, delta, np.inf)
+
+    def apply_swap(self, i, j, p_out, p_in):
+        """
+        Swaps player p_out of team i with player p_in of team j in place,
+        updating the running team sums and the fitness in O(1).
+
+        Args:
+            i (int): Index of the team that loses p_out and receives p_in.
+            j (int): Index of the team that loses p_in and receives p_out.
+            p_out (int): Player id currently in team i.
+            p_in (int): Player id currently in team j.
 
-        return np.std(avg_skills)
+        Returns:
+            float: The new fitness of the individual (None if it had not been evaluated yet).
+        """
+        evaluated = self._fitness is not None
+        feasible = evaluated and np.isfinite(self.delta_fitness(i, j, p_out, p_in)) and np.isfinite(self._fitness)
+        sq_dev = self._swap_sq_dev(i, j, p_out, p_in)
+
+        self._make_writable()
+        skill_sum, salary_sum, mean, _ = self._stats
+        genome = self._genome
+        genome[i, np.flatnonzero(genome[i] == p_out)[0]] = p_in
+        genome[j, np.flatnonzero(genome[j] == p_in)[0]] = p_out
+
+        # only the views of the two teams involved are rebuilt, the other teams are kept
+        if self._league is not None:
+            self._league[i] = self.table.team(genome[i])
+            self._league[j] = self.table.team(genome[j])
+
+        for team, change in ((i, 1), (j, -1)):
+            skill_sum[team] += change * (self.table.skill[p_in] - self.table.skill[p_out])
+            salary_sum[team] += change * (self.table.salary[p_in] - self.table.salary[p_out])
+        self._stats = (skill_sum, salary_sum, mean, sq_dev)
+
+        # an individual not evaluated yet stays lazy (it is evaluated on access or in batch by the GA)
+        if evaluated:
+            self.fitness = np.sqrt(sq_dev / len(genome)) if feasible else self.evaluate_fitness()
+        return self._fitness
+
+    def copy(self):
+        """
+        Copy-on-write copy of the individual.
+        The copy shares the genome, the team sums and the Team views with the original;
+        the genome and the team sums are only copied by the first in-place change (apply_swap)
+        of either individual, and only the views of the teams that change are rebuilt.
+        The player table and the problem definition are always shared.
+
+        Returns:
+            LeagueIndividual: The copy.
+        """
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        if self._league is not None:
+            new._league = list(self._league)
+        if self._genome is not None:
+            self._genome.flags.writeable = False  # the shared array must not be changed in place
+            self._shared = new._shared = True
+        return new
+
+    # copy the shared genome and team sums before an in-place change
+    def _make_writable(self):
+        if self._shared:
+            self._genome = self._genome.copy()
+            if self._stats is not None:
+                skill_sum, salary_sum, mean, sq_dev = self._stats
+                self._stats = (skill_sum.copy(), salary_sum.copy(), mean, sq_dev)
+            self._shared = False
+
+    def __deepcopy__(self, memo):
+        return self.copy()
 
     def __lt__(self, other):
         return self.fitness < other.fitness
 
     def __repr__(self):
-        return f"<LeagueIndividual fitness={self.fitness:.4f}>"
\ No newline at end of file
+        return f"<LeagueIndividual fitness={self.fitness:.4f}>"
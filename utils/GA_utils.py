@@ -1,4 +1,4 @@
-from algorithms.GA_selection import sel_tournament, sel_rank, sel_roulette
+from algorithms.GA_selection import sel_tournament, sel_rank, sel_roulette, sel_sus
 
 def select_parents(population, method='tournament', num_parents=2, tournament_k=3):
     """
@@ -6,7 +6,7 @@ def select_parents(population, method='tournament', num_parents=2, tournament_k=
 
     Args:
         population (list[GASolution]): Current population.
-        method (str): One of 'tournament', 'rank', 'roulette'.
+        method (str): One of 'tournament', 'rank', 'roulette', 'sus'.
         num_parents (int): Number of parents to return.
         tournament_k (int): Tournament size (used only for 'tournament' method).
 
@@ -24,5 +24,7 @@ def select_parents(population, method='tournament', num_parents=2, tournament_k=
         return sel_rank(population, fitness_values, num=num_parents)
     elif method == 'roulette':
         return sel_roulette(population, fitness_values, num=num_parents)
+    elif method == 'sus':
+        return sel_sus(population, fitness_values, num=num_parents)
     else:
         raise ValueError(f"Unknown selection method: {method}")
@@ -0,0 +1,113 @@
+import os
+import random
+import numpy as np
+
+from utils.metrics import GAHistory
+
+# CHECKPOINT FILES
+# a checkpoint is an uncompressed .npz archive of plain arrays (no pickled objects), so it is
+# written and loaded in milliseconds and can be read back with np.load(..., allow_pickle=False)
+
+def _rng_state_arrays():
+    version, mt_state, gauss_next = random.getstate()
+    np_name, np_keys, np_pos, np_has_gauss, np_gauss = np.random.get_state()
+    return {
+        'rng_python_state': np.array(mt_state, dtype=np.uint64),
+        'rng_python_meta': np.array([version, gauss_next is not None], dtype=np.int64),
+        'rng_python_gauss': np.array(gauss_next if gauss_next is not None else 0.0),
+        'rng_numpy_keys': np.asarray(np_keys, dtype=np.uint32),
+        'rng_numpy_meta': np.array([np_pos, np_has_gauss], dtype=np.int64),
+        'rng_numpy_gauss': np.array(np_gauss),
+    }
+
+
+def _restore_rng_state(data):
+    version, has_gauss = data['rng_python_meta'].tolist()
+    gauss_next = float(data['rng_python_gauss']) if has_gauss else None
+    random.setstate((version, tuple(data['rng_python_state'].tolist()), gauss_next))
+
+    np_pos, np_has_gauss = data['rng_numpy_meta'].tolist()
+    np.random.set_state(('MT19937', data['rng_numpy_keys'], np_pos, np_has_gauss, float(data['rng_numpy_gauss'])))
+
+
+def save_checkpoint(path, genomes, fitnesses, generation, evaluations, elapsed, stopping_state=None, history=None):
+    """
+    Saves the state of a genetic algorithm run: the population as player-id arrays, its fitnesses,
+    the elite, the counters of the run, the state of the `random` and `np.random` generators and
+    the generation history. The file is first written next to path and then renamed, so an
+    interrupted write never corrupts the previous checkpoint.
+
+    Args:
+        path (str): Path of the checkpoint file (.npz).
+        genomes (np.ndarray): Player ids of the population, of shape (population, num_teams, players_per_team).
+        fitnesses (np.ndarray): Fitness of each individual of the population.
+        generation (int): Number of generations completed.
+        evaluations (int): Number of fitness evaluations so far.
+        elapsed (float): Running time of the run so far, in seconds.
+        stopping_state (tuple, optional): Stagnation counters of the run (see StoppingCriteria.state).
+        history (GAHistory, optional): History of the run.
+    """
+
+    genomes = np.asarray(genomes)
+    fitnesses = np.asarray(fitnesses, dtype=np.float64)
+    elite = int(np.argmin(fitnesses))
+
+    arrays = {
+        'genomes': genomes,
+        'fitnesses': fitnesses,
+        'elite_genome': genomes[elite],
+        'elite_fitness': fitnesses[elite],
+        'counters': np.array([generation, evaluations], dtype=np.int64),
+        'elapsed': np.array(elapsed, dtype=np.float64),
+    }
+    if stopping_state is not None:
+        arrays['stopping'] = np.array(stopping_state, dtype=np.float64)
+    if history is not None:
+        for name, column in history.to_dict().items():
+            arrays[f"history/{name}"] = column
+    arrays.update(_rng_state_arrays())
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, restore_rng=True):
+    """
+    Loads a checkpoint written by save_checkpoint.
+
+    Args:
+        path (str): Path of the checkpoint file.
+        restore_rng (bool, optional): If True, the state of the `random` and `np.random` generators
+            is restored, so the resumed run continues the same random sequence. Defaults to True.
+
+    Returns:
+        dict: The checkpoint, with keys 'genomes', 'fitnesses', 'elite_genome', 'elite_fitness',
+        'generation', 'evaluations', 'elapsed', 'stopping' ((best_fitness, stagnant_generations) or None)
+        and 'history' (GAHistory).
+    """
+
+    with np.load(path, allow_pickle=False) as data:
+        if restore_rng:
+            _restore_rng_state(data)
+
+        generation, evaluations = data['counters'].tolist()
+        history = GAHistory.from_dict({name[len("history/"):]: data[name]
+                                       for name in data.files if name.startswith("history/")})
+        stopping = None
+        if 'stopping' in data.files:
+            best_fitness, stagnant_generations = data['stopping'].tolist()
+            stopping = (best_fitness, int(stagnant_generations))
+
+        return {
+            'genomes': data['genomes'],
+            'fitnesses': data['fitnesses'],
+            'elite_genome': data['elite_genome'],
+            'elite_fitness': float(data['elite_fitness']),
+            'generation': generation,
+            'evaluations': evaluations,
+            'elapsed': float(data['elapsed']),
+            'stopping': stopping,
+            'history': history,
+        }
@@ -1,23 +1,109 @@
-import time
+import os
+import json
+import random
 import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 
 from algorithms.GA_selection import sel_roulette, sel_rank, sel_tournament
 from algorithms.GA_crossover import team_crossover, position_crossover
 from algorithms.GA_mutation import mutation_swap_players, mutation_regenerate_team, mutation_balance_teams
 from algorithms.algorithm import genetic_algorithm
+from utils.fitness import FitnessCache
+from utils.metrics import CONVERGENCE_COLUMNS, save_histories
 
 # list all selection, crossover and mutation methods
 selection_methods = [sel_roulette, sel_rank, sel_tournament]
 crossover_methods = [team_crossover, position_crossover]
 mutation_methods = [mutation_swap_players, mutation_regenerate_team, mutation_balance_teams]
 
+# methods by name, so sweep tasks only carry names between processes
+methods_by_name = {fn.__name__: fn for fn in selection_methods + crossover_methods + mutation_methods}
+
+
+# SWEEP RUNS
+# state of each worker process, set once by _init_sweep_worker
+_sweep_state = {}
+
+def _init_sweep_worker(ga_kwargs):
+    _sweep_state['ga_kwargs'] = ga_kwargs
+    _sweep_state['cache'] = FitnessCache() # shared by the runs of this process
+
+
+def _sweep_run(task, ga_kwargs, fitness_cache):
+    # one run of a combo, seeded by the task, returned as a record of the results store;
+    # overrides replace some settings of ga_kwargs for this run (used by race_configurations);
+    # time_sec is the running time of the whole run, also when it was resumed from a checkpoint
+    sel, xo, mut, run, seed, checkpoint_path, overrides = task
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+    resume_from = checkpoint_path if checkpoint_path is not None and os.path.exists(checkpoint_path) else None
+    best = genetic_algorithm(selection_fn=methods_by_name[sel], crossover_fn=methods_by_name[xo],
+                             mutation_fn=methods_by_name[mut], fitness_cache=fitness_cache,
+                             checkpoint_path=checkpoint_path, resume_from=resume_from,
+                             **{**ga_kwargs, **overrides})
+
+    history = best.history.to_dict()
+    return {'selection': sel, 'crossover': xo, 'mutation': mut, 'run': run, 'seed': seed,
+            'fitness': float(best.fitness()), 'generations': len(best.history),
+            'stop_reason': best.stop_reason, 'time_sec': best.elapsed,
+            'history': {name: history[name].tolist() for name in CONVERGENCE_COLUMNS if name in history}}
+
+
+def _sweep_worker(task):
+    return _sweep_run(task, _sweep_state['ga_kwargs'], _sweep_state['cache'])
+
+
+def _run_tasks(tasks, executor, ga_kwargs, fitness_cache):
+    # yields (index of the task, record) as each task completes, in the pool if there is one
+    if executor is not None:
+        futures = {executor.submit(_sweep_worker, task): i for i, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    else:
+        for i, task in enumerate(tasks):
+            yield i, _sweep_run(task, ga_kwargs, fitness_cache)
+
+
+# RESULTS STORE
+def load_results(path):
+    """
+    Reads the runs stored by evaluate_all_combinations (one JSON record per line).
+    A truncated last line (a sweep killed while writing) is ignored.
+
+    Args:
+        path (str): Path of the results store.
+
+    Returns:
+        dict: The records, keyed by (selection, crossover, mutation, run).
+    """
+    records = {}
+    if path is None or not os.path.exists(path):
+        return records
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[(record['selection'], record['crossover'], record['mutation'], record['run'])] = record
+    return records
+
+
 def evaluate_all_combinations(players_by_position, team_structure, budget_limit, num_teams,
                                population_size=30, generations=50, runs_per_combo=3,
-                               mutation_rate=0.2, xo_prob=0.9, elitism=True, k_tournament=3, verbose=False):
+                               mutation_rate=0.2, xo_prob=0.9, elitism=True, k_tournament=3, verbose=False,
+                               fitness_cache=None, max_time=None, max_evaluations=None, stagnation=None,
+                               target_fitness=None, checkpoint_dir=None, checkpoint_interval=10,
+                               workers=None, results_path=None, seed=None, history_path=None):
     
     """
     Evaluates all possible combinations of selection, crossover, and mutation methods for a genetic algorithm.
+    Every (combination, run) is an independent task with its own seed; tasks can be spread over a pool
+    of processes, and each finished run can be appended to an on-disk results store, so a restarted
+    sweep skips the runs already done.
 
     Args:
         players_by_position (dict): Dictionary of players by position.
@@ -32,46 +118,218 @@ def evaluate_all_combinations(players_by_position, team_structure, budget_limit,
         elitism (bool): Whether to use elitism in the genetic algorithm.
         k_tournament (int): Tournament size for selection methods.
         verbose (bool): Whether to print detailed information.
+        fitness_cache (FitnessCache, optional): Fitness cache shared by every run of this process. Defaults to a
+            new cache (each worker process has its own cache).
+        max_time (float, optional): Time budget of each run in seconds.
+        max_evaluations (int, optional): Maximum number of fitness evaluations of each run.
+        stagnation (int, optional): Stop each run after this many generations without improvement.
+        target_fitness (float, optional): Stop each run as soon as this fitness is reached.
+        checkpoint_dir (str, optional): If given, every run is checkpointed to its own file in this directory,
+            and runs that already have a checkpoint are resumed from it (finished runs are not repeated),
+            so an interrupted sweep can be restarted with the same call.
+        checkpoint_interval (int, optional): Number of generations between checkpoints of a run. Defaults to 10.
+        workers (int, optional): If greater than 1, runs are executed by a pool of this many processes.
+            Defaults to None (single process).
+        results_path (str, optional): Results store (JSON lines): each finished run is appended as soon as it
+            completes, with its convergence history, and runs already in the store are not run again. The store must only be reused with
+            the same settings. Defaults to None (no store).
+        seed (int, optional): Base seed of the sweep; run i of the sweep is seeded with seed + i. Defaults to
+            None (seeds drawn from `random`, so the sweep is reproducible with random.seed).
+        history_path (str, optional): If given, the per-generation best, mean and std fitness and evaluation
+            count of every run are saved to this .npz file, one row per run with its selection, crossover,
+            mutation, run and seed as labels (see utils.metrics.save_histories). Defaults to None.
 
     Returns:
         list[dict]: List of dictionaries containing the results for each combination of methods.
         Each dictionary contains the selection, crossover, mutation methods used,
-        mean fitness, standard deviation of fitness, best fitness, and time taken for the run.
+        mean fitness, standard deviation of fitness, best fitness, and time taken for the run
+        (sum of the running times of its runs).
     """
 
-    results = []
+    ga_kwargs = dict(players_by_position=players_by_position, team_structure=team_structure,
+                     budget_limit=budget_limit, num_teams=num_teams, population_size=population_size,
+                     generations=generations, mutation_rate=mutation_rate, xo_prob=xo_prob, elitism=elitism,
+                     k_tournament=k_tournament, verbose=verbose, max_time=max_time,
+                     max_evaluations=max_evaluations, stagnation=stagnation, target_fitness=target_fitness,
+                     checkpoint_interval=checkpoint_interval)
 
-    for sel, xo, mut in itertools.product(selection_methods, crossover_methods, mutation_methods):
-        fitnesses = []
-        start = time.time()
-        for _ in range(runs_per_combo):
-            best = genetic_algorithm(
-                players_by_position=players_by_position,
-                team_structure=team_structure,
-                budget_limit=budget_limit,
-                num_teams=num_teams,
-                population_size=population_size,
-                generations=generations,
-                selection_fn=sel,
-                crossover_fn=xo,
-                mutation_fn=mut,
-                mutation_rate=mutation_rate,
-                xo_prob=xo_prob,
-                elitism=elitism,
-                k_tournament=k_tournament,
-                verbose=verbose
-            )
-            fitnesses.append(best.fitness())
-
-        end = time.time()
+    if fitness_cache is None:
+        fitness_cache = FitnessCache() # identical leagues are only scored once across the whole sweep
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    # one task per (combination, run), seeds are drawn for every task so they do not depend on what is skipped
+    combos = [(sel.__name__, xo.__name__, mut.__name__)
+              for sel, xo, mut in itertools.product(selection_methods, crossover_methods, mutation_methods)]
+    tasks = []
+    for i, (combo, run) in enumerate(itertools.product(combos, range(runs_per_combo))):
+        task_seed = seed + i if seed is not None else random.getrandbits(32)
+        checkpoint_path = None
+        if checkpoint_dir is not None:
+            checkpoint_path = os.path.join(checkpoint_dir, f"{'-'.join(combo)}-{run}.npz")
+        tasks.append((*combo, run, task_seed, checkpoint_path, {}))
+
+    records = load_results(results_path)
+    if results_path is not None and os.path.exists(results_path) and os.path.getsize(results_path):
+        with open(results_path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n") # close a line truncated by an interrupted sweep
+    pending = [task for task in tasks if tuple(task[:4]) not in records]
+
+    def store(record):
+        records[(record['selection'], record['crossover'], record['mutation'], record['run'])] = record
+        if results_path is not None:
+            with open(results_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+
+    executor = None
+    if workers is not None and workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker, initargs=(ga_kwargs,))
+    try:
+        for _, record in _run_tasks(pending, executor, ga_kwargs, fitness_cache):
+            store(record)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if history_path is not None:
+        runs = [records[tuple(task[:4])] for task in tasks]
+        save_histories(history_path, [record.get('history', {}) for record in runs],
+                       **{name: [record[name] for record in runs]
+                          for name in ('selection', 'crossover', 'mutation', 'run', 'seed')})
+
+    results = []
+    for sel, xo, mut in combos:
+        runs = [records[(sel, xo, mut, run)] for run in range(runs_per_combo)]
+        fitnesses = [record['fitness'] for record in runs]
         results.append({
-            'selection': sel.__name__,
-            'crossover': xo.__name__,
-            'mutation': mut.__name__,
+            'selection': sel,
+            'crossover': xo,
+            'mutation': mut,
             'mean_fitness': np.mean(fitnesses),
             'std_fitness': np.std(fitnesses),
             'best_fitness': np.min(fitnesses),
-            'time_sec': round(end - start, 2)
+            'time_sec': round(sum(record['time_sec'] for record in runs), 2)
         })
 
     return results
+
+
+# RACING (SUCCESSIVE HALVING)
+def race_configurations(players_by_position, team_structure, budget_limit, num_teams,
+                        population_size=30, min_generations=10, max_generations=160, eta=2, runs=3,
+                        mutation_rates=(0.2,), xo_probs=(0.9,), k_tournaments=(3,), elitism=True,
+                        workers=None, seed=None, checkpoint_dir=None, verbose=False):
+
+    """
+    Searches for the best configuration by successive halving, instead of giving every configuration
+    the same budget as evaluate_all_combinations. A configuration is a selection, crossover and mutation
+    method with a mutation_rate, xo_prob and k_tournament (only varied for tournament selection).
+    Every configuration starts with `runs` runs of min_generations generations; after each round only
+    the best 1/eta of the configurations (by mean fitness over their runs) are kept, and their runs
+    continue from their checkpoints for eta times more generations, until one configuration is left
+    or max_generations is reached.
+
+    Args:
+        players_by_position (dict): Dictionary of players by position.
+        team_structure (dict): Dictionary defining the team structure.
+        budget_limit (int): Budget limit for the teams.
+        num_teams (int): Number of teams to generate.
+        population_size (int): Size of the population.
+        min_generations (int): Generations of each run in the first round. Defaults to 10.
+        max_generations (int): Generations of each run in the last round. Defaults to 160.
+        eta (int): Factor by which the configurations are reduced and the generations increased
+            after each round. Defaults to 2.
+        runs (int): Number of runs (seeds) of each configuration. Defaults to 3.
+        mutation_rates (tuple[float]): Mutation rates searched. Defaults to (0.2,).
+        xo_probs (tuple[float]): Crossover probabilities searched. Defaults to (0.9,).
+        k_tournaments (tuple[int]): Tournament sizes searched (tournament selection only). Defaults to (3,).
+        elitism (bool): Whether to use elitism in the genetic algorithm.
+        workers (int, optional): If greater than 1, the runs of each round are executed by a pool of this
+            many processes. Defaults to None (single process).
+        seed (int, optional): Base seed; run i of the search is seeded with seed + i. Defaults to None
+            (seeds drawn from `random`).
+        checkpoint_dir (str, optional): Directory for the checkpoints of the runs. Defaults to a temporary
+            directory removed at the end.
+        verbose (bool): Whether to print the survivors of each round.
+
+    Returns:
+        list[dict]: One dictionary per configuration, with the selection, crossover and mutation methods,
+        mutation_rate, xo_prob, k_tournament, the last round it took part in and its generations, and the
+        mean, standard deviation and best fitness of its runs in that round, and the time spent on it.
+        Sorted from the best configuration (the survivor of the last round) to the first eliminated.
+    """
+
+    configs = []
+    for sel, xo, mut in itertools.product(selection_methods, crossover_methods, mutation_methods):
+        for mutation_rate, xo_prob in itertools.product(mutation_rates, xo_probs):
+            for k in (k_tournaments if sel is sel_tournament else (None,)):
+                configs.append({'selection': sel.__name__, 'crossover': xo.__name__, 'mutation': mut.__name__,
+                                'mutation_rate': mutation_rate, 'xo_prob': xo_prob, 'k_tournament': k,
+                                'round': 0, 'generations': 0, 'time_sec': 0.0})
+
+    ga_kwargs = dict(players_by_position=players_by_position, team_structure=team_structure,
+                     budget_limit=budget_limit, num_teams=num_teams, population_size=population_size,
+                     elitism=elitism, verbose=False)
+    fitness_cache = FitnessCache()
+    seeds = [[seed + c * runs + run if seed is not None else random.getrandbits(32) for run in range(runs)]
+             for c in range(len(configs))]
+
+    tmp_dir = None
+    if checkpoint_dir is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        checkpoint_dir = tmp_dir.name
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    executor = None
+    if workers is not None and workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker, initargs=(ga_kwargs,))
+
+    survivors = list(range(len(configs)))
+    generations = min_generations
+    round_number = 0
+    try:
+        while True:
+            round_number += 1
+            tasks, owners = [], []
+            for c in survivors:
+                config = configs[c]
+                overrides = {'generations': generations, 'mutation_rate': config['mutation_rate'],
+                             'xo_prob': config['xo_prob'], 'k_tournament': config['k_tournament']}
+                for run in range(runs):
+                    # runs continue from the checkpoint of the previous round
+                    checkpoint_path = os.path.join(checkpoint_dir, f"config{c}-{run}.npz")
+                    tasks.append((config['selection'], config['crossover'], config['mutation'], run,
+                                  seeds[c][run], checkpoint_path, overrides))
+                    owners.append(c)
+
+            fitnesses = {c: [] for c in survivors}
+            for i, record in _run_tasks(tasks, executor, ga_kwargs, fitness_cache):
+                fitnesses[owners[i]].append(record['fitness'])
+                configs[owners[i]]['time_sec'] += record['time_sec']
+
+            for c in survivors:
+                configs[c].update({'round': round_number, 'generations': generations,
+                                   'mean_fitness': np.mean(fitnesses[c]), 'std_fitness': np.std(fitnesses[c]),
+                                   'best_fitness': np.min(fitnesses[c])})
+            survivors.sort(key=lambda c: configs[c]['mean_fitness'])
+
+            if verbose:
+                print(f"Round {round_number} | {generations} generations | {len(survivors)} configurations | "
+                      f"best mean fitness: {configs[survivors[0]]['mean_fitness']:.4f}")
+
+            if len(survivors) == 1 or generations >= max_generations:
+                break
+            survivors = survivors[:max(1, -(-len(survivors) // eta))]
+            generations = min(generations * eta, max_generations)
+
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    for config in configs:
+        config['time_sec'] = round(config['time_sec'], 2)
+    return sorted(configs, key=lambda config: (-config['round'], config['mean_fitness']))
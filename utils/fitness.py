@@ -0,0 +1,170 @@
+from collections import OrderedDict
+import numpy as np
+
+def evaluate_population(genomes, table, team_structure, budget_limit):
+    """
+    Evaluates a whole population of leagues in one NumPy pass.
+    The fitness is the same as LeagueIndividual.evaluate_fitness: the standard deviation
+    of the average skills of the teams, or inf if the league is not valid.
+
+    Args:
+        genomes (np.ndarray): Array of player ids of shape (population, num_teams, players_per_team).
+        table (PlayerTable): The player table the ids refer to.
+        team_structure (dict): Dictionary defining the number of players required for each position in a team.
+        budget_limit (float): Maximum budget allowed for a team.
+
+    Returns:
+        tuple: Four arrays:
+            - fitness (population,): fitness of each league.
+            - team_salaries (population, num_teams): total salary of each team.
+            - team_feasible (population, num_teams): True if the team respects the structure and the budget.
+            - feasible (population,): True if every team is feasible and no player is used twice.
+    """
+
+    genomes = np.asarray(genomes)
+    pop_size = genomes.shape[0]
+
+    team_salaries = table.salary[genomes].sum(axis=-1)
+    team_feasible = (table.position_counts(genomes) == table.structure_counts(team_structure)).all(axis=-1) & \
+        (team_salaries <= budget_limit)
+
+    # Duplicated players across teams: equal neighbours once the ids of a league are sorted
+    flat = np.sort(genomes.reshape(pop_size, -1), axis=1)
+    duplicated = (flat[:, 1:] == flat[:, :-1]).any(axis=1)
+
+    feasible = team_feasible.all(axis=1) & ~duplicated
+    if genomes.shape[-1] != sum(team_structure.values()):
+        feasible[:] = False
+
+    fitness = table.skill[genomes].mean(axis=-1).std(axis=-1)
+    fitness[~feasible] = np.inf
+
+    return fitness, team_salaries, team_feasible, feasible
+
+
+def league_signatures(genomes):
+    """
+    Canonical, order-independent signatures of a batch of leagues.
+    Player ids are sorted inside each team and teams are sorted by their smallest id,
+    so two leagues with the same teams (in any order, with players in any order)
+    get the same signature.
+
+    Args:
+        genomes (np.ndarray): Array of player ids of shape (population, num_teams, players_per_team).
+
+    Returns:
+        list[bytes]: The signature of each league.
+    """
+
+    teams = np.sort(np.asarray(genomes), axis=-1)
+    order = np.argsort(teams[..., 0], axis=-1, kind='stable')
+    teams = np.take_along_axis(teams, order[..., None], axis=-2)
+    return [league.tobytes() for league in teams]
+
+
+class FitnessCache:
+    def __init__(self, maxsize=100000):
+        """
+        Bounded LRU cache of fitness values keyed by the canonical signature of a league
+        (see league_signatures), so identical leagues are only validated and scored once.
+        A single cache can be shared across generations and across runs on the same problem.
+
+        Args:
+            maxsize (int): Maximum number of leagues kept in the cache.
+
+        Returns:
+            FitnessCache: An instance of the FitnessCache class.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    # the problem is part of the key, so a cache shared by different problems never mixes them
+    # (the table is identified by its content fingerprint, not its id, which can be reused)
+    @staticmethod
+    def problem_key(table, team_structure, budget_limit):
+        return (table.fingerprint, tuple(team_structure.items()), budget_limit)
+
+    def get(self, key):
+        fitness = self._cache.get(key)
+        if fitness is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        return fitness
+
+    def put(self, key, fitness):
+        self._cache[key] = fitness
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)  # drop the least recently used league
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._cache),
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __repr__(self):
+        return f"<FitnessCache size={len(self._cache)} hits={self.hits} misses={self.misses}>"
+
+
+def evaluate_pending(population, cache=None):
+    """
+    Computes in one batch the fitness of every individual of the population that
+    has not been evaluated yet, and stores it on the individual.
+
+    Args:
+        population (list[GASolution] or list[LeagueIndividual]): Individuals sharing the same player table,
+            team structure and budget.
+        cache (FitnessCache, optional): Cache looked up before evaluating, and filled with the new values.
+
+    Returns:
+        np.ndarray: The fitness of every individual of the population, in order.
+    """
+
+    individuals = [getattr(ind, 'individual', ind) for ind in population]
+    pending = [ind for ind in individuals if ind._fitness is None and ind.genome is not None]
+
+    if pending:
+        first = pending[0]
+        genomes = np.stack([ind.genome for ind in pending])
+
+        if cache is not None:
+            problem = FitnessCache.problem_key(first.table, first.team_structure, first.budget_limit)
+            keys = [(problem, signature) for signature in league_signatures(genomes)]
+            missing = {}  # key -> positions in pending, identical leagues of the batch are scored once
+            for k, (ind, key) in enumerate(zip(pending, keys)):
+                fit = cache.get(key) if key not in missing else None
+                if fit is None:
+                    missing.setdefault(key, []).append(k)
+                else:
+                    ind.fitness = fit
+
+            if missing:
+                first_of_each = [positions[0] for positions in missing.values()]
+                fitness, _, _, _ = evaluate_population(genomes[first_of_each], first.table,
+                                                       first.team_structure, first.budget_limit)
+                for (key, positions), fit in zip(missing.items(), fitness.tolist()):
+                    cache.put(key, fit)
+                    for k in positions:
+                        pending[k].fitness = fit
+        else:
+            fitness, _, _, _ = evaluate_population(genomes, first.table, first.team_structure, first.budget_limit)
+            for ind, fit in zip(pending, fitness.tolist()):
+                ind.fitness = fit
+
+    return np.array([ind.fitness for ind in individuals], dtype=np.float64)
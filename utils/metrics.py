@@ -0,0 +1,186 @@
+import os
+import numpy as np
+
+# OPERATOR ATTEMPTS
+# counters of the operators of this process: name -> {'calls', 'attempts', 'max_attempts', 'failures', ...}
+_operator_attempts = {}
+
+def _counters(operator):
+    entry = _operator_attempts.get(operator)
+    if entry is None:
+        entry = _operator_attempts[operator] = {'calls': 0, 'attempts': 0, 'max_attempts': 0, 'failures': 0}
+    return entry
+
+
+def record_attempts(operator, attempts, max_attempts, success=True):
+    """
+    Records one call of an operator that retries internally.
+
+    Args:
+        operator (str): Name of the operator.
+        attempts (int): Number of attempts used by the call.
+        max_attempts (int): Maximum number of attempts allowed to the call.
+        success (bool): False if the call gave up after max_attempts.
+    """
+    entry = _counters(operator)
+    entry['calls'] += 1
+    entry['attempts'] += attempts
+    entry['max_attempts'] += max_attempts
+    entry['failures'] += not success
+
+
+def record_repair(operator, swaps, success=True):
+    """
+    Records one repair of a candidate built by an operator.
+
+    Args:
+        operator (str): Name of the operator.
+        swaps (int): Number of swaps made by the repair.
+        success (bool): False if the candidate could not be repaired.
+    """
+    entry = _counters(operator)
+    entry['repairs'] = entry.get('repairs', 0) + 1
+    entry['repair_swaps'] = entry.get('repair_swaps', 0) + swaps
+    entry['repair_failures'] = entry.get('repair_failures', 0) + (not success)
+
+
+def take_operator_attempts():
+    """
+    Returns the counters recorded since the last call and resets them.
+
+    Returns:
+        dict: For each operator, a dict with the number of calls, the attempts used,
+        the sum of the max_attempts of the calls and the number of failed calls
+        (and, for operators that repair, the number of repairs, swaps and failed repairs).
+    """
+    taken = {name: dict(entry) for name, entry in _operator_attempts.items()}
+    _operator_attempts.clear()
+    return taken
+
+
+def merge_operator_attempts(total, other):
+    """
+    Adds the counters of other (as returned by take_operator_attempts) to total, in place.
+    """
+    for name, counts in other.items():
+        entry = total.setdefault(name, {})
+        for key, value in counts.items():
+            entry[key] = entry.get(key, 0) + value
+    return total
+
+
+# GENERATION HISTORY
+class GAHistory:
+    def __init__(self, capacity=64):
+        """
+        In-memory history of a genetic algorithm run, with one row per generation.
+        Each metric is a column stored in a NumPy array that grows by doubling, so
+        appending a generation does not allocate. Columns are created on first use
+        (earlier generations are filled with nan).
+
+        Args:
+            capacity (int): Initial number of generations allocated.
+
+        Returns:
+            GAHistory: An instance of the GAHistory class.
+        """
+        self.capacity = max(1, capacity)
+        self.size = 0
+        self.columns = {}
+
+    def append(self, **values):
+        if self.size == self.capacity:
+            self.capacity *= 2
+            for name, column in self.columns.items():
+                grown = np.full(self.capacity, np.nan)
+                grown[:self.size] = column[:self.size]
+                self.columns[name] = grown
+
+        for name, value in values.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = np.full(self.capacity, np.nan)
+            column[self.size] = value
+        self.size += 1
+
+    def __getitem__(self, name):
+        return self.columns[name][:self.size]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __len__(self):
+        return self.size
+
+    def names(self):
+        return list(self.columns)
+
+    # rebuilds a history from the columns returned by to_dict
+    @classmethod
+    def from_dict(cls, columns):
+        size = max((len(column) for column in columns.values()), default=0)
+        history = cls(capacity=max(64, size))
+        for name, column in columns.items():
+            history.columns[name] = np.full(history.capacity, np.nan)
+            history.columns[name][:len(column)] = column
+        history.size = size
+        return history
+
+    def to_dict(self):
+        return {name: column[:self.size].copy() for name, column in self.columns.items()}
+
+    def __repr__(self):
+        return f"<GAHistory generations={self.size} metrics={len(self.columns)}>"
+
+
+# CONVERGENCE HISTORIES
+# per-generation columns kept for every run of a sweep
+CONVERGENCE_COLUMNS = ('best', 'mean', 'std', 'evaluations')
+
+def save_histories(path, histories, columns=CONVERGENCE_COLUMNS, **labels):
+    """
+    Saves the histories of many runs to one uncompressed .npz file. Each column is stored as a
+    (runs, generations) array padded with nan after the end of shorter runs, with the number of
+    generations of each run in 'lengths', so curves of thousands of runs fit in a few arrays.
+    np.load only reads the arrays that are accessed.
+
+    Args:
+        path (str): Path of the .npz file.
+        histories (list[GAHistory or dict]): History of each run, or its columns (see GAHistory.to_dict).
+        columns (tuple[str]): Columns saved. Defaults to best, mean, std and evaluations.
+        **labels: Arrays with one value per run saved along the histories (for example the selection,
+            crossover and mutation of each run).
+    """
+
+    histories = [history.to_dict() if isinstance(history, GAHistory) else history for history in histories]
+    lengths = np.array([max((len(column) for column in history.values()), default=0) for history in histories],
+                       dtype=np.int64)
+
+    arrays = {'lengths': lengths}
+    for name in columns:
+        matrix = np.full((len(histories), lengths.max(initial=0)), np.nan)
+        for row, history in zip(matrix, histories):
+            if name in history:
+                row[:len(history[name])] = history[name]
+        arrays[name] = matrix
+    for name, values in labels.items():
+        arrays[f"label/{name}"] = np.asarray(values)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_histories(path):
+    """
+    Loads the histories saved by save_histories.
+
+    Args:
+        path (str): Path of the .npz file.
+
+    Returns:
+        dict: The (runs, generations) array of each column, 'lengths', and the labels under their names.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        return {name.split('/', 1)[-1]: data[name] for name in data.files}
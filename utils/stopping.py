@@ -0,0 +1,89 @@
+import time
+
+class StoppingCriteria:
+    def __init__(self, generations=None, max_time=None, max_evaluations=None, stagnation=None,
+                 target_fitness=None, min_improvement=0.0):
+        """
+        Combination of stopping criteria for a genetic algorithm: the run stops as soon as
+        one of the criteria that are set fires. Criteria left as None are not checked.
+
+        Args:
+            generations (int, optional): Maximum number of generations.
+            max_time (float, optional): Time budget in seconds, measured from start().
+            max_evaluations (int, optional): Maximum number of fitness evaluations.
+            stagnation (int, optional): Stop after this many generations without improvement of the best fitness.
+            target_fitness (float, optional): Stop when the best fitness is lower than or equal to this value.
+            min_improvement (float, optional): Minimum decrease of the best fitness counted as an improvement
+                by the stagnation criterion. Defaults to 0.0.
+
+        Returns:
+            StoppingCriteria: An instance of the StoppingCriteria class.
+
+        Raises:
+            ValueError: If no criterion is set (the run would never stop).
+        """
+        if generations is None and max_time is None and max_evaluations is None and stagnation is None \
+                and target_fitness is None:
+            raise ValueError("At least one stopping criterion must be set.")
+
+        self.generations = generations
+        self.max_time = max_time
+        self.max_evaluations = max_evaluations
+        self.stagnation = stagnation
+        self.target_fitness = target_fitness
+        self.min_improvement = min_improvement
+        self.start()
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.best_fitness = float('inf')
+        self.stagnant_generations = 0
+        self.reason = None
+
+    # stagnation counters, saved in checkpoints
+    def state(self):
+        return self.best_fitness, self.stagnant_generations
+
+    # continues a run interrupted after `elapsed` seconds, with the counters returned by state()
+    def resume(self, elapsed, state):
+        self.start_time = time.perf_counter() - elapsed
+        self.best_fitness, self.stagnant_generations = state
+        self.reason = None
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def update(self, generation, best_fitness, evaluations):
+        """
+        Records the state of the run after a generation and checks the criteria.
+
+        Args:
+            generation (int): Number of generations completed.
+            best_fitness (float): Best fitness of the current population.
+            evaluations (int): Number of fitness evaluations so far.
+
+        Returns:
+            str: The name of the criterion that fired ('target_fitness', 'max_time', 'max_evaluations',
+            'stagnation' or 'generations'), or None if the run should continue.
+        """
+        if best_fitness < self.best_fitness - self.min_improvement:
+            self.best_fitness = best_fitness
+            self.stagnant_generations = 0
+        elif generation > 0:
+            self.stagnant_generations += 1
+
+        if self.target_fitness is not None and best_fitness <= self.target_fitness:
+            self.reason = 'target_fitness'
+        elif self.max_time is not None and self.elapsed() >= self.max_time:
+            self.reason = 'max_time'
+        elif self.max_evaluations is not None and evaluations >= self.max_evaluations:
+            self.reason = 'max_evaluations'
+        elif self.stagnation is not None and self.stagnant_generations >= self.stagnation:
+            self.reason = 'stagnation'
+        elif self.generations is not None and generation >= self.generations:
+            self.reason = 'generations'
+
+        return self.reason
+
+    def __repr__(self):
+        return f"<StoppingCriteria reason={self.reason}>"